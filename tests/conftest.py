@@ -0,0 +1,243 @@
+"""Shared pytest configuration for the backend test suite."""
+import os
+import sys
+import random
+import functools
+import socket
+import tempfile
+from datetime import date
+from urllib.parse import urlparse
+import httpx
+import orjson
+import pytest
+import pytest_asyncio
+import pyzipper
+from unittest.mock import AsyncMock
+
+# Make the backend packages importable for every test module (runs once per session).
+BACKEND_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend"))
+if BACKEND_PATH not in sys.path:
+    sys.path.insert(0, BACKEND_PATH)
+
+from models.db_models import ConversationDB
+
+LOCKED_ZIP_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../locked_secrets/api_key.zip"))
+PLAINTEXT_KEY_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../api_key.txt"))
+PASSWORD = "Quantom2321999"
+
+EMULATOR_URL = os.environ.get("EMULATOR_URL", "http://localhost:8000/api/v1")
+OPENROUTER_URL = "https://openrouter.ai/api/v1"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-network", action="store_true", default=False,
+        help="run tests marked 'network' that hit live third-party services",
+    )
+
+
+# pytest-xdist groups (run with `-n auto --dist loadgroup`). The emulator is a single local
+# GPU container and the FastAPI app writes to one SQLite file, so tests touching either stay
+# on one worker. Session fixtures are per worker, so the random_models tests also share one
+# worker and see the same sample. Everything else spreads freely; without xdist these
+# markers are inert.
+_EMULATOR_FIXTURES = frozenset({"emulator_model", "resolved_emulator_model", "emulator_probes"})
+
+
+def _xdist_group(item) -> str | None:
+    """The scheduling group for ``item``; a test needing both the emulator and the app goes with the emulator."""
+    if "random_models" in item.fixturenames:
+        return "random_models"
+    if item.get_closest_marker("docker") or not _EMULATOR_FIXTURES.isdisjoint(item.fixturenames):
+        return "emulator"
+    if "asgi_client" in item.fixturenames:
+        return "backend_db"
+    return None
+
+
+def pytest_collection_modifyitems(config, items):
+    """Apply session-wide skips (live-network tests are opt-in, some need the locked API key) and xdist groups."""
+    for item in items:
+        group = _xdist_group(item)
+        if group:
+            item.add_marker(pytest.mark.xdist_group(group))
+
+    if not config.getoption("--run-network"):
+        skip_network = pytest.mark.skip(reason="needs --run-network")
+        for item in items:
+            if "network" in item.keywords:
+                item.add_marker(skip_network)
+
+    if os.path.exists(LOCKED_ZIP_PATH):
+        return
+    skip_no_zip = pytest.mark.skip(reason="locked_secrets/api_key.zip not found. Cannot test OpenRouter API.")
+    for item in items:
+        if item.module.__name__.endswith("test_openrouter") and "api_key" in item.fixturenames:
+            item.add_marker(skip_no_zip)
+
+
+class _StubDB:
+    """Plain-Python stand-in for a Session: query().filter().first() yields one conversation."""
+    def __init__(self, conversation):
+        self.conversation = conversation
+
+    def query(self, *_):
+        return self
+
+    def filter(self, *_):
+        return self
+
+    def first(self):
+        return self.conversation
+
+    def commit(self):
+        pass
+
+    def refresh(self, _):
+        pass
+
+
+@pytest.fixture
+def mock_db():
+    """A session stub whose query().filter().first() returns a test conversation."""
+    return _StubDB(ConversationDB(id="test_id", title="Test", messages=[]))
+
+
+@pytest.fixture
+def _no_sleep(monkeypatch):
+    """Replace asyncio.sleep as seen by services.openrouter (e.g. the 2s titling delay) with a no-op."""
+    monkeypatch.setattr("services.openrouter.asyncio.sleep", AsyncMock())
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def shared_http_client():
+    """One pooled httpx.AsyncClient for live-network tests, so connections are reused across them."""
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        yield client
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def asgi_client():
+    """One in-process AsyncClient bound to the FastAPI app, shared by every ASGI route test."""
+    from main import app
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+# ── Live OpenRouter / emulator fixtures (shared by every module, resolved once per session) ──
+
+@functools.lru_cache(maxsize=1)
+def _get_api_key() -> str:
+    """Get the OpenRouter API key — always available (unlocked at most once per process)."""
+    # Try the plaintext file first
+    if os.path.exists(PLAINTEXT_KEY_PATH):
+        with open(PLAINTEXT_KEY_PATH, "r") as f:
+            key = f.read().strip()
+            if key:
+                return key
+    # Unlock from zip
+    with pyzipper.AESZipFile(LOCKED_ZIP_PATH) as z:
+        return z.read("api_key.txt", pwd=PASSWORD.encode("utf-8")).decode("utf-8").strip()
+
+
+def _emulator_available() -> bool:
+    """Check if the emulator Docker container is reachable (plain TCP connect, no HTTP round trip)."""
+    url = urlparse(EMULATOR_URL)
+    port = url.port or (443 if url.scheme == "https" else 80)
+    try:
+        socket.create_connection((url.hostname, port), timeout=0.5).close()
+        return True
+    except OSError:
+        return False
+
+
+def _get_emulator_model() -> str:
+    """Auto-detect the model loaded in the emulator."""
+    try:
+        resp = httpx.get(f"{EMULATOR_URL}/models", timeout=10.0)
+        if resp.status_code == 200:
+            data = resp.json()
+            if data.get("data") and len(data["data"]) > 0:
+                return data["data"][0]["id"]
+    except Exception:
+        pass
+    return os.environ.get("TEST_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
+
+
+@pytest.fixture(scope="session")
+def api_key():
+    """Provides the OpenRouter API key (unlocked once per session). Fails if unavailable."""
+    return _get_api_key()
+
+
+def _is_cheap(model: dict) -> bool:
+    """True when the model's prompt price parses and is below the test budget threshold."""
+    price = (model.get("pricing") or {}).get("prompt")
+    if not price:
+        return False
+    try:
+        return float(price) < 0.00005
+    except (TypeError, ValueError):
+        return False
+
+
+def _cached_models(api_key: str) -> list[dict]:
+    """The OpenRouter /models catalog, cached in the temp dir for the rest of the day."""
+    cache_path = os.path.join(tempfile.gettempdir(), f"openrouter_models_{date.today().isoformat()}.json")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                return orjson.loads(f.read()).get("data", [])
+        except (OSError, orjson.JSONDecodeError):
+            pass  # Unreadable or truncated cache — refetch below
+
+    headers = {"Authorization": f"Bearer {api_key}"}
+    resp = httpx.get(f"{OPENROUTER_URL}/models", headers=headers, timeout=30.0)
+    assert resp.status_code == 200, f"Failed to fetch models from OpenRouter: {resp.status_code}"
+    all_models = orjson.loads(resp.content).get("data", [])
+    if all_models:
+        # Write-then-rename so parallel xdist workers never read a half-written file
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(resp.content)
+        os.replace(tmp_path, cache_path)
+    return all_models
+
+
+@pytest.fixture(scope="session")
+def random_models(api_key):
+    """Selects 5 random models from the (daily-cached) OpenRouter catalog."""
+    all_models = _cached_models(api_key)
+    assert len(all_models) > 0, "OpenRouter returned no models!"
+
+    # Filter to models that are likely cheap and fast for testing
+    # Exclude very expensive/slow models, free-tier models that may have rate limits
+    candidates = [
+        m for m in all_models
+        if m.get("id")
+        and not m["id"].startswith("openrouter/")  # skip meta models
+        and _is_cheap(m)
+    ]
+
+    if len(candidates) < 5:
+        # If not enough cheap models, fallback to all models
+        candidates = all_models
+
+    selected = random.sample(candidates, min(5, len(candidates)))
+    model_ids = [m["id"] for m in selected]
+    print(f"\n{'='*60}")
+    print(f"  RANDOMLY SELECTED MODELS FOR THIS TEST RUN:")
+    for i, mid in enumerate(model_ids, 1):
+        print(f"    {i}. {mid}")
+    print(f"{'='*60}\n")
+    return model_ids
+
+
+@pytest.fixture(scope="session")
+def emulator_model():
+    """Get the emulator's loaded model (probed once per session). Fails if emulator is not running."""
+    assert _emulator_available(), (
+        "Emulator Docker container is NOT running at "
+        f"{EMULATOR_URL}! Start it before running tests."
+    )
+    return _get_emulator_model()
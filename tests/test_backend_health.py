@@ -1,34 +1,25 @@
-import os
-import sys
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend")))
-
 import pytest
-from httpx import AsyncClient, ASGITransport
-from main import app
 
 @pytest.mark.asyncio
-async def test_read_root():
+async def test_read_root(asgi_client):
     """Verify that the FastAPI root endpoint works and routes are mounted"""
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-        response = await client.get("/")
-        assert response.status_code == 200
-        assert response.json() == {"status": "Backend V2 is running", "mounted": "/data"}
+    response = await asgi_client.get("/")
+    assert response.status_code == 200
+    assert response.json() == {"status": "Backend V2 is running", "mounted": "/data"}
 
 @pytest.mark.asyncio
-async def test_chat_conversations_route_exists():
+async def test_chat_conversations_route_exists(asgi_client):
     """Verify that the chat router is correctly wired and DB connects"""
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-        # We don't have conversations yet, so it should return 200 []
-        response = await client.get("/chat/conversations")
-        assert response.status_code == 200
-        assert isinstance(response.json(), list)
+    # We don't have conversations yet, so it should return 200 []
+    response = await asgi_client.get("/chat/conversations")
+    assert response.status_code == 200
+    assert isinstance(response.json(), list)
 
 @pytest.mark.asyncio
-async def test_models_route_exists():
+async def test_models_route_exists(asgi_client):
     """Verify the models router returns at least one model"""
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-        response = await client.get("/models")
-        assert response.status_code == 200
-        data = response.json()
-        assert len(data) > 0
-        assert data[0]["provider"] in ("INTERNAL", "OPENROUTER")
+    response = await asgi_client.get("/models")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) > 0
+    assert data[0]["provider"] in ("INTERNAL", "OPENROUTER")
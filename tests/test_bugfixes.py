@@ -1,12 +1,7 @@
 """Tests for the 3 bug fixes: chat model auto-detection, OpenRouter model list, and provider labels."""
-import os
-import sys
 import pytest
-from httpx import AsyncClient, ASGITransport
 from unittest.mock import patch, MagicMock, AsyncMock
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend")))
-from main import app
 from settings import settings
 
 
@@ -97,7 +92,7 @@ class TestOpenRouterModelList:
     @patch("routers.models.get_api_key")
     @patch("routers.models.httpx.AsyncClient")
     async def test_openrouter_models_fetched_successfully(
-        self, mock_httpx_class, mock_get_key, mock_provider, mock_url, mock_internal
+        self, mock_httpx_class, mock_get_key, mock_provider, mock_url, mock_internal, asgi_client
     ):
         """When OpenRouter is active and returns models, they should all be labeled OPENROUTER."""
         mock_internal.return_value = False
@@ -121,13 +116,12 @@ class TestOpenRouterModelList:
         
         mock_httpx_class.return_value = AsyncClientMock()
         
-        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-            res = await client.get("/models")
-            assert res.status_code == 200
-            data = res.json()
-            assert len(data) == 2
-            for m in data:
-                assert m["provider"] == "OPENROUTER"
+        res = await asgi_client.get("/models")
+        assert res.status_code == 200
+        data = res.json()
+        assert len(data) == 2
+        for m in data:
+            assert m["provider"] == "OPENROUTER"
 
     @pytest.mark.asyncio
     @patch("routers.models.settings.is_internal_llm")
@@ -136,7 +130,7 @@ class TestOpenRouterModelList:
     @patch("routers.models.get_api_key")
     @patch("routers.models.httpx.AsyncClient")
     async def test_openrouter_fallback_when_fetch_fails(
-        self, mock_httpx_class, mock_get_key, mock_provider, mock_url, mock_internal
+        self, mock_httpx_class, mock_get_key, mock_provider, mock_url, mock_internal, asgi_client
     ):
         """When OpenRouter fetch fails, fallback should show OPENROUTER models, NOT INTERNAL."""
         mock_internal.return_value = False
@@ -151,14 +145,13 @@ class TestOpenRouterModelList:
         
         mock_httpx_class.return_value = AsyncClientMock()
         
-        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-            res = await client.get("/models")
-            assert res.status_code == 200
-            data = res.json()
-            assert len(data) > 0
-            # ALL models should be labeled OPENROUTER, not INTERNAL
-            for m in data:
-                assert m["provider"] == "OPENROUTER", f"Expected OPENROUTER but got {m['provider']} for {m['id']}"
+        res = await asgi_client.get("/models")
+        assert res.status_code == 200
+        data = res.json()
+        assert len(data) > 0
+        # ALL models should be labeled OPENROUTER, not INTERNAL
+        for m in data:
+            assert m["provider"] == "OPENROUTER", f"Expected OPENROUTER but got {m['provider']} for {m['id']}"
 
     @pytest.mark.asyncio
     @patch("routers.models.settings.is_internal_llm")
@@ -167,7 +160,7 @@ class TestOpenRouterModelList:
     @patch("routers.models.get_api_key")
     @patch("routers.models.httpx.AsyncClient")
     async def test_openrouter_fallback_includes_popular_models(
-        self, mock_httpx_class, mock_get_key, mock_provider, mock_url, mock_internal
+        self, mock_httpx_class, mock_get_key, mock_provider, mock_url, mock_internal, asgi_client
     ):
         """OpenRouter fallback should include well-known models the user can select."""
         mock_internal.return_value = False
@@ -182,12 +175,11 @@ class TestOpenRouterModelList:
         
         mock_httpx_class.return_value = AsyncClientMock()
         
-        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-            res = await client.get("/models")
-            data = res.json()
-            ids = [m["id"] for m in data]
-            assert "openai/gpt-4o-mini" in ids
-            assert "anthropic/claude-3.5-haiku" in ids
+        res = await asgi_client.get("/models")
+        data = res.json()
+        ids = [m["id"] for m in data]
+        assert "openai/gpt-4o-mini" in ids
+        assert "anthropic/claude-3.5-haiku" in ids
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -203,7 +195,7 @@ class TestProviderLabels:
     @patch("routers.models.get_api_key")
     @patch("routers.models.httpx.AsyncClient")
     async def test_emulator_models_labeled_internal(
-        self, mock_httpx_class, mock_get_key, mock_provider, mock_internal
+        self, mock_httpx_class, mock_get_key, mock_provider, mock_internal, asgi_client
     ):
         """When emulator is active, all models should say INTERNAL."""
         mock_internal.return_value = True
@@ -223,11 +215,10 @@ class TestProviderLabels:
         
         mock_httpx_class.return_value = AsyncClientMock()
         
-        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-            res = await client.get("/models")
-            data = res.json()
-            for m in data:
-                assert m["provider"] == "INTERNAL"
+        res = await asgi_client.get("/models")
+        data = res.json()
+        for m in data:
+            assert m["provider"] == "INTERNAL"
 
     @pytest.mark.asyncio
     @patch("routers.models.settings.is_internal_llm")
@@ -235,7 +226,7 @@ class TestProviderLabels:
     @patch("routers.models.get_api_key")
     @patch("routers.models.httpx.AsyncClient")
     async def test_no_internal_label_in_openrouter_mode(
-        self, mock_httpx_class, mock_get_key, mock_provider, mock_internal
+        self, mock_httpx_class, mock_get_key, mock_provider, mock_internal, asgi_client
     ):
         """When OpenRouter is active, no model should ever be labeled INTERNAL."""
         mock_internal.return_value = False
@@ -258,8 +249,7 @@ class TestProviderLabels:
         
         mock_httpx_class.return_value = AsyncClientMock()
         
-        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-            res = await client.get("/models")
-            data = res.json()
-            for m in data:
-                assert m["provider"] != "INTERNAL", f"Model {m['id']} should not be labeled INTERNAL in OpenRouter mode"
+        res = await asgi_client.get("/models")
+        data = res.json()
+        for m in data:
+            assert m["provider"] != "INTERNAL", f"Model {m['id']} should not be labeled INTERNAL in OpenRouter mode"
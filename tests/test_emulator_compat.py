@@ -23,37 +23,24 @@ Usage:
 """
 
 import os
-import sys
 import json
 import time
 import pytest
 import httpx
 
+from conftest import _get_api_key
+
 # ── Configuration ────────────────────────────────────────────────────────────
 EMULATOR_URL = os.environ.get("EMULATOR_URL", "http://localhost:8000/api/v1")
 OPENROUTER_URL = "https://openrouter.ai/api/v1"
 
 # Resolve the API key for OpenRouter comparison tests
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend")))
-
 def _get_openrouter_key():
-    """Get the OpenRouter API key, or None if unavailable."""
+    """Get the OpenRouter API key, or None if unavailable (conftest unlocks it once per session)."""
     try:
-        import pyzipper
-        zip_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../locked_secrets/api_key.zip"))
-        if os.path.exists(zip_path):
-            with pyzipper.AESZipFile(zip_path) as z:
-                z.pwd = b"Quantom2321999"
-                with z.open("api_key.txt") as f:
-                    return f.read().decode("utf-8").strip()
+        return _get_api_key()
     except Exception:
-        pass
-    
-    key_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../api_key.txt"))
-    if os.path.exists(key_path):
-        with open(key_path, "r") as f:
-            return f.read().strip()
-    return None
+        return None
 
 
 # ── Test model for local testing (small enough for RTX 3080) ─────────────────
@@ -1014,24 +1001,21 @@ class TestBackendEmulatorIntegration:
             assert len(full_text) > 0, "No text content received from emulator!"
 
     @pytest.mark.asyncio
-    async def test_model_listing_through_emulator(self):
+    async def test_model_listing_through_emulator(self, asgi_client):
         """Test that the models endpoint works when pointed at the emulator."""
         from unittest.mock import patch
-        from httpx import AsyncClient, ASGITransport
-        from main import app
         
         with patch("routers.models.settings.get_llm_base_url", return_value=EMULATOR_URL), \
              patch("routers.models.settings.is_internal_llm", return_value=True), \
              patch("routers.models.get_api_key", return_value="internal-emulator-key"):
             
-            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-                resp = await client.get("/models")
-                assert resp.status_code == 200
-                data = resp.json()
+            resp = await asgi_client.get("/models")
+            assert resp.status_code == 200
+            data = resp.json()
                 
-                # Should have at least the base internal model + models from emulator
-                assert len(data) >= 1
+            # Should have at least the base internal model + models from emulator
+            assert len(data) >= 1
                 
-                # All should be labeled INTERNAL
-                for m in data:
-                    assert m["provider"] == "INTERNAL"
+            # All should be labeled INTERNAL
+            for m in data:
+                assert m["provider"] == "INTERNAL"
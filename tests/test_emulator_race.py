@@ -2,13 +2,6 @@ import pytest
 import asyncio
 import json
 import httpx
-import sys
-import os
-
-# Set up paths
-backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend"))
-if backend_path not in sys.path:
-    sys.path.append(backend_path)
 
 from services import openrouter
 from settings import settings
@@ -1,11 +1,7 @@
-import os
-import sys
 import json
 import pytest
 import httpx
 
-# ── Path setup ───────────────────────────────────────────────────────────────
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend")))
 from settings import settings
 
 # Base URL for the local backend
@@ -52,12 +48,13 @@ async def test_mode_restriction_logic():
         # We'll use the streaming endpoint
         async with client.stream("POST", f"{API_BASE}/chat", json=payload, timeout=60.0) as resp:
             assert resp.status_code == 200
-            full_text = ""
+            text_parts = []
             async for line in resp.aiter_lines():
                 if line.startswith("data: ") and "[DONE]" not in line:
                     data = json.loads(line[6:])
                     if data.get("choices"):
-                        full_text += data["choices"][0].get("delta", {}).get("content", "")
+                        text_parts.append(data["choices"][0].get("delta", {}).get("content", ""))
+            full_text = "".join(text_parts)
             
             # Verify thinking tags are present
             assert "<think>" in full_text
@@ -75,12 +72,13 @@ async def test_auto_mode_intelligent_trigger():
     
     async with httpx.AsyncClient() as client:
         async with client.stream("POST", f"{API_BASE}/chat", json=payload, timeout=60.0) as resp:
-            full_text = ""
+            text_parts = []
             async for line in resp.aiter_lines():
                 if line.startswith("data: ") and "[DONE]" not in line:
                     data = json.loads(line[6:])
                     if data.get("choices"):
-                        full_text += data["choices"][0].get("delta", {}).get("content", "")
+                        text_parts.append(data["choices"][0].get("delta", {}).get("content", ""))
+            full_text = "".join(text_parts)
             
             # For complex math, it SHOULD trigger thinking in auto mode
             # (Note: This depends on the model following the 'auto' instructions well)
@@ -1,16 +1,11 @@
-import os
-import sys
 import pytest
-from httpx import AsyncClient, ASGITransport
 from unittest.mock import patch, MagicMock
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend")))
-from main import app
 
 @pytest.mark.asyncio
 @patch("routers.models.get_api_key")
 @patch("routers.models.httpx.AsyncClient")
-async def test_models_list_with_external_models(mock_httpx_class, mock_get_key):
+async def test_models_list_with_external_models(mock_httpx_class, mock_get_key, asgi_client):
     """When external models are fetched, they should be returned (no hardcoded fallback)."""
     mock_get_key.return_value = "fake_key"
     
@@ -30,18 +25,17 @@ async def test_models_list_with_external_models(mock_httpx_class, mock_get_key):
         
     mock_httpx_class.return_value = AsyncClientMock()
     
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-        res = await client.get("/models")
-        assert res.status_code == 200
-        data = res.json()
-        assert len(data) == 2  # Only the fetched models
-        assert any(m["id"] == "openai/gpt-4o-mini" for m in data)
-        assert any(m["id"] == "anthropic/claude-3-haiku" for m in data)
+    res = await asgi_client.get("/models")
+    assert res.status_code == 200
+    data = res.json()
+    assert len(data) == 2  # Only the fetched models
+    assert any(m["id"] == "openai/gpt-4o-mini" for m in data)
+    assert any(m["id"] == "anthropic/claude-3-haiku" for m in data)
 
 @pytest.mark.asyncio
 @patch("routers.models.get_api_key")
 @patch("routers.models.httpx.AsyncClient")
-async def test_models_list_api_failure_shows_fallback(mock_httpx_class, mock_get_key):
+async def test_models_list_api_failure_shows_fallback(mock_httpx_class, mock_get_key, asgi_client):
     """If the external API fails, it should return fallback models."""
     mock_get_key.return_value = "bad_key"
     
@@ -52,18 +46,17 @@ async def test_models_list_api_failure_shows_fallback(mock_httpx_class, mock_get
         
     mock_httpx_class.return_value = AsyncClientMock()
     
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-        res = await client.get("/models")
-        assert res.status_code == 200
-        data = res.json()
-        assert len(data) >= 1  # At least one fallback model
+    res = await asgi_client.get("/models")
+    assert res.status_code == 200
+    data = res.json()
+    assert len(data) >= 1  # At least one fallback model
 
 @pytest.mark.asyncio
 @patch("routers.models.settings.is_internal_llm")
 @patch("routers.models.settings.get_llm_base_url")
 @patch("routers.models.get_api_key")
 @patch("routers.models.httpx.AsyncClient")
-async def test_models_list_internal_llm_provider_label(mock_httpx_class, mock_get_key, mock_url, mock_internal):
+async def test_models_list_internal_llm_provider_label(mock_httpx_class, mock_get_key, mock_url, mock_internal, asgi_client):
     """When using internal LLM, fetched models should be labeled INTERNAL not OPENROUTER."""
     mock_internal.return_value = True
     mock_url.return_value = "http://emulator:8000/api/v1"
@@ -84,29 +77,27 @@ async def test_models_list_internal_llm_provider_label(mock_httpx_class, mock_ge
         
     mock_httpx_class.return_value = AsyncClientMock()
     
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-        res = await client.get("/models")
-        assert res.status_code == 200
-        data = res.json()
-        assert len(data) == 1  # Only the fetched model (no duplicate fallback)
-        assert data[0]["provider"] == "INTERNAL"
+    res = await asgi_client.get("/models")
+    assert res.status_code == 200
+    data = res.json()
+    assert len(data) == 1  # Only the fetched model (no duplicate fallback)
+    assert data[0]["provider"] == "INTERNAL"
 
 @pytest.mark.asyncio
 @patch("routers.models.get_api_key")
-async def test_models_no_api_key_shows_fallback(mock_get_key):
+async def test_models_no_api_key_shows_fallback(mock_get_key, asgi_client):
     """With no API key, should return fallback models."""
     mock_get_key.return_value = ""
     
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-        res = await client.get("/models")
-        assert res.status_code == 200
-        data = res.json()
-        assert len(data) >= 1  # At least one fallback model
+    res = await asgi_client.get("/models")
+    assert res.status_code == 200
+    data = res.json()
+    assert len(data) >= 1  # At least one fallback model
 
 @pytest.mark.asyncio
 @patch("routers.models.get_api_key")
 @patch("routers.models.httpx.AsyncClient")
-async def test_models_names_are_prettified(mock_httpx_class, mock_get_key):
+async def test_models_names_are_prettified(mock_httpx_class, mock_get_key, asgi_client):
     """Model names from emulator should be prettified, not raw paths."""
     mock_get_key.return_value = "fake_key"
     
@@ -125,12 +116,11 @@ async def test_models_names_are_prettified(mock_httpx_class, mock_get_key):
         
     mock_httpx_class.return_value = AsyncClientMock()
     
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-        res = await client.get("/models")
-        assert res.status_code == 200
-        data = res.json()
-        # The name should be prettified
-        assert "model_cache" not in data[0]["name"]
-        assert "/app" not in data[0]["name"]
-        # But the ID should be preserved for API calls
-        assert data[0]["id"] == "/app/model_cache/Qwen_Qwen2.5-0.5B-Instruct"
+    res = await asgi_client.get("/models")
+    assert res.status_code == 200
+    data = res.json()
+    # The name should be prettified
+    assert "model_cache" not in data[0]["name"]
+    assert "/app" not in data[0]["name"]
+    # But the ID should be preserved for API calls
+    assert data[0]["id"] == "/app/model_cache/Qwen_Qwen2.5-0.5B-Instruct"
@@ -1,134 +1,126 @@
-import os
 import json
+import asyncio
 import pytest
-import pyzipper
+import pytest_asyncio
 import httpx
-from unittest.mock import patch
+import orjson
+import respx
 
 # Constants
-LOCKED_ZIP_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../locked_secrets/api_key.zip"))
-PASSWORD = "Quantom2321999"
+AUTH_URL = "https://openrouter.ai/api/v1/auth/key"
+CHAT_COMPLETIONS_URL = "https://openrouter.ai/api/v1/chat/completions"
 
-@pytest.fixture
-def api_key():
-    """Extracts and provides the actual API key for testing"""
-    if not os.path.exists(LOCKED_ZIP_PATH):
-        pytest.skip("locked_secrets/api_key.zip not found. Cannot test OpenRouter API.")
+# Static request bodies are serialized once at import and sent via content=
+_STREAMING_PAYLOAD_BYTES = orjson.dumps({
+    "model": "openai/gpt-4o-mini",  # Fast, cheap test model
+    "messages": [{"role": "user", "content": "Reply with precisely the word 'PONG'."}],
+    "stream": True,
+    "max_tokens": 10
+})
+
+# Extremely tiny 1x1 Red Pixel PNG in Base64
+RED_PIXEL_B64 = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+
+# Static request body for the multimodal test
+_MULTIMODAL_PAYLOAD = {
+    "model": "openai/gpt-4o-mini",
+    "messages": [
+        {
+            "role": "user", 
+            "content": [
+                {"type": "text", "text": "Are you able to see images? What is the single dominant color of this simple 1x1 image? Reply with ONLY the color name (e.g. Blue)."},
+                {"type": "image_url", "image_url": {"url": RED_PIXEL_B64}}
+            ]
+        }
+    ],
+    "stream": False,
+    "max_tokens": 10
+}
+_MULTIMODAL_PAYLOAD_BYTES = orjson.dumps(_MULTIMODAL_PAYLOAD)
+
+def _chat_headers(api_key):
+    """Headers for a direct chat/completions call authenticated with api_key."""
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "HTTP-Referer": "http://localhost:8000",
+        "X-Title": "Agent V2 Test Suite",
+        "Content-Type": "application/json"
+    }
+
+async def _stream_pong(client, api_key):
+    """Streams the PONG completion and returns (status_code, error_body, chunks_received, full_text)."""
+    async with client.stream("POST", CHAT_COMPLETIONS_URL, headers=_chat_headers(api_key), content=_STREAMING_PAYLOAD_BYTES, timeout=30.0) as response:
+        if response.status_code != 200:
+            return response.status_code, await response.aread(), 0, ""
         
-    try:
-        with pyzipper.AESZipFile(LOCKED_ZIP_PATH) as z:
-            z.pwd = PASSWORD.encode('utf-8')
-            with z.open("api_key.txt") as f:
-                return f.read().decode('utf-8').strip()
-    except Exception as e:
-        pytest.fail(f"Could not extract API key for test: {e}")
+        chunks_received = 0
+        text_parts = []
+        async for chunk in response.aiter_lines():
+            if chunk.startswith("data: ") and chunk != "data: [DONE]":
+                try:
+                    data = json.loads(chunk[6:])
+                    if data.get("choices") and len(data["choices"]) > 0:
+                        delta = data["choices"][0].get("delta", {}).get("content", "")
+                        text_parts.append(delta)
+                        chunks_received += 1
+                except json.JSONDecodeError:
+                    pass
+        return response.status_code, b"", chunks_received, "".join(text_parts)
+
+@pytest_asyncio.fixture(scope="module", loop_scope="session")
+async def live_checks(api_key, shared_http_client):
+    """Runs the independent auth and streaming round trips concurrently; each test asserts on its own result."""
+    auth, stream = await asyncio.gather(
+        shared_http_client.get(AUTH_URL, headers={"Authorization": f"Bearer {api_key}"}),
+        _stream_pong(shared_http_client, api_key),
+        return_exceptions=True,
+    )
+    return {"auth": auth, "stream": stream}
 
 @pytest.mark.asyncio
-async def test_openrouter_authentication(api_key):
+async def test_openrouter_authentication(live_checks):
     """Tests if the OpenRouter API accepts our decrypted key."""
-    url = "https://openrouter.ai/api/v1/auth/key"
-    headers = {
-        "Authorization": f"Bearer {api_key}"
-    }
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers)
+    response = live_checks["auth"]
+    if isinstance(response, BaseException):
+        raise response
         
-        # 401 means the key extracted correctly but OpenRouter says it's invalid/revoked.
-        # 200 means the key is fully functional.
-        assert response.status_code == 200, f"OpenRouter rejected the API key. Status: {response.status_code}, Body: {response.text}"
+    # 401 means the key extracted correctly but OpenRouter says it's invalid/revoked.
+    # 200 means the key is fully functional.
+    assert response.status_code == 200, f"OpenRouter rejected the API key. Status: {response.status_code}, Body: {response.text}"
 
 @pytest.mark.asyncio
-async def test_openrouter_streaming_completion(api_key):
+async def test_openrouter_streaming_completion(live_checks):
     """Verifies that we can successfully stream a completion from OpenRouter."""
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "HTTP-Referer": "http://localhost:8000",
-        "X-Title": "Agent V2 Test Suite",
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "model": "openai/gpt-4o-mini",  # Fast, cheap test model
-        "messages": [{"role": "user", "content": "Reply with precisely the word 'PONG'."}],
-        "stream": True,
-        "max_tokens": 10
-    }
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            async with client.stream("POST", url, headers=headers, json=payload, timeout=30.0) as response:
-                assert response.status_code == 200, f"Streaming request failed: {await response.aread()}"
-                
-                chunks_received = 0
-                full_text = ""
-                async for chunk in response.aiter_lines():
-                    if chunk.startswith("data: ") and chunk != "data: [DONE]":
-                        try:
-                            data = json.loads(chunk[6:])
-                            if data.get("choices") and len(data["choices"]) > 0:
-                                delta = data["choices"][0].get("delta", {}).get("content", "")
-                                full_text += delta
-                                chunks_received += 1
-                        except json.JSONDecodeError:
-                            pass
-                            
-                assert chunks_received > 0, "No valid data chunks received!"
-                assert "PONG" in full_text.upper(), f"Model did not reply exactly 'PONG'. It said: {full_text}"
-                
-        except httpx.RequestError as e:
-            pytest.fail(f"Network error during streaming test: {e}")
+    result = live_checks["stream"]
+    if isinstance(result, httpx.RequestError):
+        pytest.fail(f"Network error during streaming test: {result}")
+    if isinstance(result, BaseException):
+        raise result
+    
+    status_code, error_body, chunks_received, full_text = result
+    assert status_code == 200, f"Streaming request failed: {error_body}"
+    assert chunks_received > 0, "No valid data chunks received!"
+    assert "PONG" in full_text.upper(), f"Model did not reply exactly 'PONG'. It said: {full_text}"
 
 @pytest.mark.asyncio
-async def test_openrouter_streaming_multimodal(api_key):
+async def test_openrouter_streaming_multimodal(api_key, shared_http_client):
     """Verifies that the OpenRouter API accepts the [{type: 'text'}, {type: 'image_url'}] array format."""
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "HTTP-Referer": "http://localhost:8000",
-        "X-Title": "Agent V2 Test Suite",
-        "Content-Type": "application/json"
-    }
-
-    # Extremely tiny 1x1 Red Pixel PNG in Base64
-    red_pixel_b64 = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
-    
-    payload = {
-        "model": "openai/gpt-4o-mini",
-        "messages": [
-            {
-                "role": "user", 
-                "content": [
-                    {"type": "text", "text": "Are you able to see images? What is the single dominant color of this simple 1x1 image? Reply with ONLY the color name (e.g. Blue)."},
-                    {"type": "image_url", "image_url": {"url": red_pixel_b64}}
-                ]
-            }
-        ],
-        "stream": False,
-        "max_tokens": 10
-    }
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, headers=headers, json=payload, timeout=30.0)
-            assert response.status_code == 200, f"Multimodal request failed: {response.text}"
-            
-            data = response.json()
-            assert data.get("choices"), "No choices returned from Multimodal request!"
-            content = data["choices"][0]["message"]["content"]
-            
-            assert "red" in content.lower(), f"Model failed to see the red pixel! It responded with: {content}"
-            
-        except httpx.RequestError as e:
-            pytest.fail(f"Network error during multimodal test: {e}")
+    try:
+        response = await shared_http_client.post(CHAT_COMPLETIONS_URL, headers=_chat_headers(api_key), content=_MULTIMODAL_PAYLOAD_BYTES, timeout=30.0)
+        assert response.status_code == 200, f"Multimodal request failed: {response.text}"
+        
+        data = response.json()
+        assert data.get("choices"), "No choices returned from Multimodal request!"
+        content = data["choices"][0]["message"]["content"]
+        
+        assert "red" in content.lower(), f"Model failed to see the red pixel! It responded with: {content}"
+        
+    except httpx.RequestError as e:
+        pytest.fail(f"Network error during multimodal test: {e}")
 
 @pytest.mark.asyncio
 async def test_openrouter_tool_calling_online(api_key):
     """Verifies that the OpenRouter API accepts our tool schema and correctly predicts a search."""
-    import sys
-    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend")))
-    
     from models.schemas import ChatRequest, Message
     from services.openrouter import generate_chat_openrouter
     
@@ -158,9 +150,6 @@ async def test_openrouter_tool_calling_online(api_key):
 @pytest.mark.asyncio
 async def test_openrouter_tool_calling_offline(api_key):
     """Verifies that the OpenRouter API is BLOCKED from using tools when offline_mode=True."""
-    import sys
-    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend")))
-    
     from models.schemas import ChatRequest, Message
     from services.openrouter import generate_chat_openrouter
     
@@ -179,43 +168,16 @@ async def test_openrouter_tool_calling_offline(api_key):
     assert not any("Searching the Web" in c for c in chunks_received), "Security Breach: Model invoked a tool while in Offline Mode!"
 
 @pytest.mark.asyncio
-@patch("services.openrouter.httpx.AsyncClient")
-async def test_openrouter_tool_fallback_for_unsupported_models(mock_httpx_class, api_key):
+@respx.mock
+async def test_openrouter_tool_fallback_for_unsupported_models(api_key):
     """Verifies that if an OpenRouter model does not support tool use (returning 404/400), we gracefully retry without tools."""
-    import sys
-    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend")))
-    
     from models.schemas import ChatRequest, Message
     from services.openrouter import generate_chat_openrouter
     
-    class MockStreamResponse:
-        def __init__(self, with_tools):
-            self.with_tools = with_tools
-            self.status_code = 404 if with_tools else 200
-            
-        async def __aenter__(self):
-            return self
-            
-        async def __aexit__(self, exc_type, exc, tb):
-            pass
-            
-        async def aread(self):
-            return b'{"error":{"message":"No endpoints found that support tool use.","code":404}}'
-            
-        async def aiter_lines(self):
-            yield 'data: {"choices":[{"delta":{"content":"PONG"}}]}'
-            yield 'data: [DONE]'
-
-    class MockClientContext:
-        async def __aenter__(self): return self
-        async def __aexit__(self, exc_type, exc, tb): pass
-        
-        def stream(self, method, url, **kwargs):
-            payload = kwargs.get('json', {})
-            with_tools = 'tools' in payload
-            return MockStreamResponse(with_tools)
-            
-    mock_httpx_class.return_value = MockClientContext()
+    route = respx.post(CHAT_COMPLETIONS_URL).mock(side_effect=[
+        httpx.Response(404, content=b'{"error":{"message":"No endpoints found that support tool use.","code":404}}'),
+        httpx.Response(200, content=b'data: {"choices":[{"delta":{"content":"PONG"}}]}\n\ndata: [DONE]\n\n'),
+    ])
     
     req = ChatRequest(
         model="fake/model",
@@ -234,57 +196,32 @@ async def test_openrouter_tool_fallback_for_unsupported_models(mock_httpx_class,
     
     # It must successfully recover and stream the answer
     assert any("PONG" in content.upper() for content in chunks_received), "Model failed to output PONG post-fallback."
+    
+    # The retry must have been sent without the tool schema
+    assert route.call_count == 2, f"Expected exactly one retry, got {route.call_count} requests."
+    assert "tools" in json.loads(route.calls[0].request.content)
+    assert "tools" not in json.loads(route.calls[1].request.content)
 
 @pytest.mark.asyncio
-@patch("services.openrouter.httpx.AsyncClient")
-async def test_openrouter_tool_context_retention(mock_httpx_class, api_key):
+@respx.mock
+async def test_openrouter_tool_context_retention(api_key):
     """Verifies that text generated before a tool call (like <think> tags) is preserved when executing the tool."""
-    import sys
-    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend")))
-    
     from models.schemas import ChatRequest, Message
     from services.openrouter import generate_chat_openrouter
     
-    second_request_payload = {}
-    
-    class MockStreamResponse:
-        def __init__(self, is_second_pass):
-            self.is_second_pass = is_second_pass
-            self.status_code = 200
-            
-        async def __aenter__(self): return self
-        async def __aexit__(self, exc_type, exc, tb): pass
-        
-        async def aread(self): return b''
-            
-        async def aiter_lines(self):
-            if not self.is_second_pass:
-                # First pass: emit some thought context, then a tool call
-                yield 'data: {"choices":[{"delta":{"content":"<think>Let me search</think>\\n"}}]}'
-                yield 'data: {"choices":[{"delta":{"tool_calls":[{"id":"call_123","function":{"name":"web_search","arguments":"{\\"query\\":\\"test\\"}"}}]}}]}'
-                yield 'data: [DONE]'
-            else:
-                # Second pass: emit final answer
-                yield 'data: {"choices":[{"delta":{"content":"Search completed."}}]}'
-                yield 'data: [DONE]'
-
-    class MockClientContext:
-        def __init__(self):
-            self.pass_count = 0
-            
-        async def __aenter__(self): return self
-        async def __aexit__(self, exc_type, exc, tb): pass
-        
-        def stream(self, method, url, **kwargs):
-            self.pass_count += 1
-            payload = kwargs.get('json', {})
-            if self.pass_count == 2:
-                # Capture the payload of the second request to verify history preservation
-                nonlocal second_request_payload
-                second_request_payload = payload
-            return MockStreamResponse(is_second_pass=(self.pass_count == 2))
-            
-    mock_httpx_class.return_value = MockClientContext()
+    route = respx.post(CHAT_COMPLETIONS_URL).mock(side_effect=[
+        # First pass: emit some thought context, then a tool call
+        httpx.Response(200, content=(
+            b'data: {"choices":[{"delta":{"content":"<think>Let me search</think>\\n"}}]}\n\n'
+            b'data: {"choices":[{"delta":{"tool_calls":[{"id":"call_123","function":{"name":"web_search","arguments":"{\\"query\\":\\"test\\"}"}}]}}]}\n\n'
+            b'data: [DONE]\n\n'
+        )),
+        # Second pass: emit final answer
+        httpx.Response(200, content=(
+            b'data: {"choices":[{"delta":{"content":"Search completed."}}]}\n\n'
+            b'data: [DONE]\n\n'
+        )),
+    ])
     
     req = ChatRequest(
         model="fake/model",
@@ -293,8 +230,9 @@ async def test_openrouter_tool_context_retention(mock_httpx_class, api_key):
     
     chunks = [c async for c in generate_chat_openrouter(req, offline_mode=False)]
     
-    # Check that second_request_payload captured the messages properly
-    assert "messages" in second_request_payload, "Second request was never made!"
+    # Check that the second request captured the messages properly
+    assert route.call_count == 2, "Second request was never made!"
+    second_request_payload = json.loads(route.calls[1].request.content)
     messages = second_request_payload["messages"]
     
     # We expect: system, user, assistant (with tool calls AND content), tool result
@@ -1,24 +1,13 @@
-import os
-import sys
 import json
+import httpx
 import pytest
-from unittest.mock import patch, MagicMock, AsyncMock
+from unittest.mock import patch, AsyncMock
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend")))
-
-from services.skills import process_skills, handle_generate_image, _build_pollinations_url
-from models.db_models import ConversationDB
+from services.skills import process_skills, handle_generate_image, _build_pollinations_url, POLLINATIONS_MAX_ATTEMPTS
 
 
 # ── fixtures ──────────────────────────────────────────────────────────────────
-
-@pytest.fixture
-def mock_db():
-    db = MagicMock()
-    mock_conv = ConversationDB(id="test_id", title="Test", messages=[])
-    db.query().filter().first.return_value = mock_conv
-    return db
-
+# (mock_db lives in conftest.py)
 
 class _MockResponse:
     """Minimal httpx.Response substitute."""
@@ -47,6 +36,11 @@ class _MockHTTPXClient:
         return next(self._responses)
 
 
+def _all_530s():
+    """A fresh client whose every Pollinations attempt returns HTTP 530 (the iterator is one-shot)."""
+    return _MockHTTPXClient([_MockResponse(530, b"", "text/plain") for _ in range(POLLINATIONS_MAX_ATTEMPTS)])
+
+
 # ── basic dispatch tests ──────────────────────────────────────────────────────
 
 @pytest.mark.asyncio
@@ -92,11 +86,10 @@ async def test_generate_image_success_pollinations(mock_cls, mock_db):
     chunks = [c async for c in handle_generate_image("a cool cat", mock_db, "test_id")]
 
     assert len(chunks) == 1
-    payload = json.loads(chunks[0][6:])          # strip "data: "
-    text = payload["choices"][0]["delta"]["content"]
-    assert "![Generated Image]" in text
-    assert "a cool cat" in text
-    assert "⚠️" not in text
+    # ASCII markers survive json.dumps unescaped, so check the raw SSE line directly
+    assert "![Generated Image]" in chunks[0]
+    assert "a cool cat" in chunks[0]
+    assert "Image generation failed" not in chunks[0]
 
 
 # ── retry path: Pollinations returns 530 twice then succeeds ─────────────────
@@ -112,11 +105,9 @@ async def test_generate_image_retries_on_530(mock_cls, mock_sleep, mock_db):
 
     chunks = [c async for c in handle_generate_image("sunset", mock_db, "test_id")]
 
-    payload = json.loads(chunks[0][6:])
-    text = payload["choices"][0]["delta"]["content"]
     # Must NOT show the 530 error to the user — succeeded on 3rd try
-    assert "530" not in text
-    assert "![" in text
+    assert "530" not in chunks[0]
+    assert "![" in chunks[0]
 
 
 # ── permanent failure path: shows error message ────────────────────────────────
@@ -128,11 +119,7 @@ async def test_generate_image_shows_error_on_permanent_failure(
     mock_cls, mock_sleep, mock_db
 ):
     """When all Pollinations attempts fail, we just show a friendly error without a fallback image."""
-    mock_cls.return_value = _MockHTTPXClient([
-        _MockResponse(530, b"", "text/plain"),
-        _MockResponse(530, b"", "text/plain"),
-        _MockResponse(530, b"", "text/plain"),
-    ])
+    mock_cls.return_value = _all_530s()
 
     chunks = [c async for c in handle_generate_image("abstract art", mock_db, "test_id")]
 
@@ -142,19 +129,17 @@ async def test_generate_image_shows_error_on_permanent_failure(
     assert "failed" in text.lower() or "unavailable" in text.lower()
 
 
+# ── pollinations availability probe (opt-in, skipped when down) ──────────────
 
-# ── pollinations availability probe (skipped when down) ──────────────────────
-
-@pytest.mark.asyncio
-async def test_pollinations_probe():
+@pytest.mark.network
+@pytest.mark.asyncio(loop_scope="session")
+async def test_pollinations_probe(shared_http_client):
     """Probes Pollinations. Marks as SKIPPED (not failed) when it is down so CI stays green."""
-    import httpx
     try:
-        async with httpx.AsyncClient() as client:
-            r = await client.get(
-                "https://image.pollinations.ai/prompt/dog?nologo=true&seed=1&width=64&height=64",
-                timeout=10.0, follow_redirects=True
-            )
+        r = await shared_http_client.get(
+            "https://image.pollinations.ai/prompt/dog?nologo=true&seed=1&width=64&height=64",
+            follow_redirects=True
+        )
         if r.status_code == 530:
             pytest.skip("Pollinations.ai is currently down (HTTP 530). Skipping live probe.")
         assert r.status_code == 200, f"Unexpected Pollinations status: {r.status_code}"
@@ -1,13 +1,10 @@
 import pytest
-import os
-import sys
 from unittest.mock import MagicMock, patch
 
-# Add backend to path
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend")))
-
 from services.openrouter import generate_title_background
 
+pytestmark = pytest.mark.usefixtures("_no_sleep")
+
 @pytest.mark.asyncio
 async def test_generate_title_background_uses_provided_model():
     """Verifies that the titration background task uses the provided model string in its payload."""
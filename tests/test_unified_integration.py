@@ -19,21 +19,17 @@ Usage:
 """
 
 import os
-import sys
-import json
-import random
 import re
 import asyncio
+import contextlib
+from typing import Callable
 import pytest
+import pytest_asyncio
 import httpx
-import pyzipper
+import orjson
 
-# ── Path setup ───────────────────────────────────────────────────────────────
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend")))
-
-from main import app
-from httpx import AsyncClient, ASGITransport
 from models.schemas import ChatRequest, Message
+from services import openrouter
 from services.openrouter import generate_chat_openrouter, generate_title_background
 from services import skills
 from settings import settings
@@ -45,8 +41,15 @@ from settings import settings
 
 EMULATOR_URL = os.environ.get("EMULATOR_URL", "http://localhost:8000/api/v1")
 OPENROUTER_URL = "https://openrouter.ai/api/v1"
-LOCKED_ZIP_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../locked_secrets/api_key.zip"))
-PASSWORD = "Quantom2321999"
+# The emulator's base URL as the backend expects it in settings
+_EMULATOR_BASE_URL = EMULATOR_URL.rsplit("/api/v1", 1)[0] + "/api/v1"
+
+# Static request headers; callers add their own Authorization on top.
+_BASE_HEADERS = {
+    "HTTP-Referer": "http://localhost:8000",
+    "X-Title": "Unified Test Suite",
+    "Content-Type": "application/json",
+}
 
 # ── Models known to support thinking ──
 THINKING_CAPABLE_MODELS = [
@@ -64,151 +67,251 @@ TOOL_CAPABLE_MODELS = [
     "google/gemini-2.5-flash-preview",
 ]
 
+# ── SSE framing, matched on raw bytes ──
+_SSE_DATA_PREFIX = b"data: "
+_SSE_DONE = b"[DONE]"
+_SSE_DATA_LINE_RE = re.compile(rb"^data: (.+?)\r?$", re.M)
 
-def _get_api_key() -> str:
-    """Get the OpenRouter API key — always available."""
-    # Try the plaintext file first
-    key_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../api_key.txt"))
-    if os.path.exists(key_path):
-        with open(key_path, "r") as f:
-            key = f.read().strip()
-            if key:
-                return key
-    # Unlock from zip
-    with pyzipper.AESZipFile(LOCKED_ZIP_PATH) as z:
-        z.pwd = PASSWORD.encode("utf-8")
-        with z.open("api_key.txt") as f:
-            return f.read().decode("utf-8").strip()
-
-
-def _emulator_available() -> bool:
-    """Check if the emulator Docker container is reachable."""
-    try:
-        base = EMULATOR_URL.rstrip("/").rsplit("/api/v1", 1)[0]
-        resp = httpx.get(f"{base}/", timeout=5.0)
-        return resp.status_code == 200
-    except Exception:
-        return False
+# ── Markdown preprocessing patterns (mirroring the frontend's MarkdownRenderer) ──
+_THINK_RE = re.compile(r"<think>([\s\S]*?)</think>")
+_OPEN_THINK_RE = re.compile(r"<think>(?!.*</think>)([\s\S]*)$", re.IGNORECASE)
+# A complete DSML block, or (when no closing tag follows) everything from a dangling opener
+_DSML_RE = re.compile(
+    r'<\s*\|\s*DSML\s*\|(?:[\s\S]*?<\s*/\s*\|\s*DSML\s*\|\s*function_calls\s*>|[\s\S]*$)',
+    re.IGNORECASE,
+)
+# LaTeX \[ \] and \( \) delimiters, rewritten to remark-math's $$ / $ in one pass
+_LATEX_DELIM_RE = re.compile(r"\\([\[\]()])")
+_LATEX_DELIM_MAP = {"[": "$$", "]": "$$", "(": "$", ")": "$"}
 
+# Any Unicode letter (word characters minus digits and underscore)
+_HAS_ALPHA_RE = re.compile(r"[^\W\d_]")
+
+
+def _sse_frame(content: str) -> bytes:
+    """A complete SSE data frame carrying one content delta (built once, at import)."""
+    return _SSE_DATA_PREFIX + orjson.dumps({"choices": [{"delta": {"content": content}}]}) + b"\n\n"
+
+
+# Canned frames for the mocked generate_chat_openrouter in the full-stack tests
+_MOCK_HELLO_SSE = _sse_frame("Hello from test!")
+_MOCK_CRUD_SSE = _sse_frame("CRUD test")
 
-def _get_emulator_model() -> str:
-    """Auto-detect the model loaded in the emulator."""
-    try:
-        resp = httpx.get(f"{EMULATOR_URL}/models", timeout=10.0)
-        if resp.status_code == 200:
-            data = resp.json()
-            if data.get("data") and len(data["data"]) > 0:
-                return data["data"][0]["id"]
-    except Exception:
-        pass
-    return os.environ.get("TEST_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
-
-
-@pytest.fixture(scope="module")
-def api_key():
-    """Provides the OpenRouter API key. Fails if unavailable."""
-    return _get_api_key()
-
-
-@pytest.fixture(scope="module")
-def random_models(api_key):
-    """Fetches all models from OpenRouter and selects 5 randomly."""
-    headers = {"Authorization": f"Bearer {api_key}"}
-    resp = httpx.get(f"{OPENROUTER_URL}/models", headers=headers, timeout=30.0)
-    assert resp.status_code == 200, f"Failed to fetch models from OpenRouter: {resp.status_code}"
-    all_models = resp.json().get("data", [])
-    assert len(all_models) > 0, "OpenRouter returned no models!"
-
-    # Filter to models that are likely cheap and fast for testing
-    # Exclude very expensive/slow models, free-tier models that may have rate limits
-    candidates = [
-        m for m in all_models
-        if m.get("id")
-        and not m["id"].startswith("openrouter/")  # skip meta models
-        and float(m.get("pricing", {}).get("prompt", "999") or "999") < 0.00005  # cheap models
-    ]
-
-    if len(candidates) < 5:
-        # If not enough cheap models, fallback to all models
-        candidates = all_models
-
-    selected = random.sample(candidates, min(5, len(candidates)))
-    model_ids = [m["id"] for m in selected]
-    print(f"\n{'='*60}")
-    print(f"  RANDOMLY SELECTED MODELS FOR THIS TEST RUN:")
-    for i, mid in enumerate(model_ids, 1):
-        print(f"    {i}. {mid}")
-    print(f"{'='*60}\n")
-    return model_ids
-
-
-@pytest.fixture(scope="module")
-def emulator_model():
-    """Get the emulator's loaded model. Fails if emulator is not running."""
-    assert _emulator_available(), (
-        "Emulator Docker container is NOT running at "
-        f"{EMULATOR_URL}! Start it before running tests."
-    )
-    return _get_emulator_model()
 
+def _rjson(response: httpx.Response):
+    """Decode a response body with orjson (straight from bytes, skipping httpx's stdlib path)."""
+    return orjson.loads(response.content)
 
-async def _collect_stream_response(api_key: str, url: str, payload: dict) -> tuple[list[dict], str]:
-    """Send a streaming request and collect all chunks + full text."""
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "HTTP-Referer": "http://localhost:8000",
-        "X-Title": "Unified Test Suite",
-        "Content-Type": "application/json",
-    }
+
+def _delta_content(chunk: dict) -> str:
+    """Return the streamed content delta of an OpenAI-style SSE chunk, or '' if it has none."""
+    choices = chunk.get("choices")
+    if not choices:
+        return ""
+    return (choices[0].get("delta") or {}).get("content") or ""
+
+
+def _has_visible_text(text: str, chunks: list[dict]) -> bool:
+    """Early-stop predicate: at least one chunk arrived and some non-whitespace content was streamed."""
+    return bool(chunks) and bool(text.strip())
+
+
+async def _collect_stream_response(
+    client: httpx.AsyncClient,
+    api_key: str,
+    url: str,
+    payload: dict,
+    early_stop: Callable[[str, list[dict]], bool] | None = None,
+) -> tuple[list[dict], str, dict[str, bool]]:
+    """Send a streaming request on the shared client and collect all chunks + full text.
+
+    Also returns flags noted while parsing (``has_reasoning``: some delta carried
+    ``reasoning``/``reasoning_details``). If ``early_stop(text_so_far, chunks)``
+    returns True, the stream is closed and whatever was collected so far is returned.
+    """
+    headers = {**_BASE_HEADERS, "Authorization": f"Bearer {api_key}"}
     chunks = []
-    full_text = ""
-    got_done = False
-
-    async with httpx.AsyncClient() as client:
-        async with client.stream(
-            "POST", url, headers=headers, json=payload, timeout=60.0
-        ) as response:
-            assert response.status_code == 200, (
-                f"Streaming request to {url} failed with status {response.status_code}"
-            )
-            async for line in response.aiter_lines():
-                if not line:
-                    continue
-                if line.strip() == "data: [DONE]":
-                    got_done = True
-                    continue
-                if line.startswith("data: "):
-                    try:
-                        chunk = json.loads(line[6:])
-                        chunks.append(chunk)
-                        if chunk.get("choices") and len(chunk["choices"]) > 0:
-                            delta = chunk["choices"][0].get("delta", {})
-                            content = delta.get("content", "")
-                            if content:
-                                full_text += content
-                    except json.JSONDecodeError:
-                        pass
-
-    return chunks, full_text
-
-
-async def _collect_generator_response(gen) -> tuple[list[str], str]:
-    """Collect all chunks from an async generator and build full text."""
+    text_parts = []
+    flags = {"has_reasoning": False}
+
+    def _handle_line(line: bytes):
+        line = line.strip()
+        if not line.startswith(_SSE_DATA_PREFIX):
+            return
+        body = line[len(_SSE_DATA_PREFIX):]
+        if body == _SSE_DONE:
+            return
+        try:
+            chunk = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return
+        chunks.append(chunk)
+        choices = chunk.get("choices")
+        if not choices:
+            return
+        delta = choices[0].get("delta") or {}
+        if delta.get("reasoning") or delta.get("reasoning_details"):
+            flags["has_reasoning"] = True
+        content = delta.get("content")
+        if content:
+            text_parts.append(content)
+
+    async with client.stream(
+        "POST", url, headers=headers, json=payload, timeout=60.0
+    ) as response:
+        assert response.status_code == 200, (
+            f"Streaming request to {url} failed with status {response.status_code}"
+        )
+        # Split raw bytes on newlines ourselves (keeping the trailing fragment)
+        # so each data line goes straight to orjson without a str decode.
+        buf = bytearray()
+        async for data in response.aiter_bytes():
+            buf.extend(data)
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                _handle_line(line)
+            if early_stop and early_stop("".join(text_parts), chunks):
+                break  # leaving the stream context closes the response
+        else:
+            _handle_line(buf)
+
+    return chunks, "".join(text_parts), flags
+
+
+async def _collect_generator_response(
+    gen, needles: tuple[str, ...] = ()
+) -> tuple[list[str], str, set[str]]:
+    """Collect all chunks from an async generator and build full text.
+
+    Any of ``needles`` seen in a raw chunk is recorded in the returned ``hit``
+    set, so callers can check for markers without joining the whole stream.
+    """
     raw_chunks = []
-    full_text = ""
+    text_parts: list[str] = []
+    hit: set[str] = set()
     async for chunk in gen:
         raw_chunks.append(chunk)
-        if "data: " in chunk and "[DONE]" not in chunk:
+        for needle in needles:
+            if needle not in hit and needle in chunk:
+                hit.add(needle)
+        data_bytes = chunk.encode() if isinstance(chunk, str) else chunk
+        for match in _SSE_DATA_LINE_RE.finditer(data_bytes):
+            payload = match.group(1)
+            if payload == _SSE_DONE:
+                continue
             try:
-                data = json.loads(chunk.strip().replace("data: ", "", 1).split("\n")[0])
-                if data.get("choices") and len(data["choices"]) > 0:
-                    delta = data["choices"][0].get("delta", {})
-                    content = delta.get("content", "")
-                    if content:
-                        full_text += content
-            except (json.JSONDecodeError, IndexError):
-                pass
-    return raw_chunks, full_text
+                data = orjson.loads(payload)
+            except orjson.JSONDecodeError:
+                continue
+            content = _delta_content(data)
+            if content:
+                text_parts.append(content)
+    return raw_chunks, "".join(text_parts), hit
+
+
+async def _run_model_probes(probe, model_ids: list[str]) -> None:
+    """Run probe(model_id) for every model concurrently.
+
+    Each probe returns a one-line status message (soft failures included) or raises
+    on a hard failure. Messages are printed in model order once all probes finish,
+    then the first hard failure, if any, is re-raised.
+    """
+    results = await asyncio.gather(*(probe(m) for m in model_ids), return_exceptions=True)
+    failures = []
+    for result in results:
+        if isinstance(result, BaseException):
+            failures.append(result)
+        else:
+            print(result)
+    if failures:
+        raise failures[0]
+
+
+async def _gather_mode_responses(
+    model_ids: list[str], prototype: ChatRequest
+) -> list[tuple[str, str | BaseException]]:
+    """Stream ``prototype`` once per model, all concurrently.
+
+    Returns (model_id, full_text) pairs in model order; a model that errored
+    carries its exception in place of the text.
+    """
+    async def _run(model_id: str) -> str:
+        # Shallow, unvalidated copy: the service only reads the shared messages list
+        req = prototype.model_copy(update={"model": model_id})
+        _, full_text, _ = await _collect_generator_response(
+            generate_chat_openrouter(req, offline_mode=False)
+        )
+        return full_text
+
+    results = await asyncio.gather(*(_run(m) for m in model_ids), return_exceptions=True)
+    return list(zip(model_ids, results))
+
+
+_RESOLVE_FALLBACK = "fallback-model"
+
+
+@contextlib.contextmanager
+def _override_llm_base_url(url: str):
+    """Point the backend at ``url`` for the duration of the block, then restore the previous URL."""
+    original = settings.get_llm_base_url()
+    settings.set_llm_base_url(url)
+    try:
+        yield
+    finally:
+        settings.set_llm_base_url(original)
+
+
+@pytest.fixture(scope="class")
+def openrouter_base_url():
+    """Point the backend at OpenRouter once for a whole test class."""
+    with _override_llm_base_url(OPENROUTER_URL):
+        yield
+
+
+@pytest.fixture(scope="session")
+def original_llm_base_url():
+    """The LLM base URL the session started with; tests that switch providers restore it."""
+    return settings.get_llm_base_url()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def resolved_emulator_model(emulator_model):
+    """What the backend's _resolve_emulator_model() detects on the emulator, resolved once per session.
+
+    The service cache is cleared before and after, so other tests never inherit it;
+    tests that chat through the emulator prime it with _prime_emulator_model_cache().
+    """
+    openrouter.invalidate_emulator_model_cache()
+    try:
+        with _override_llm_base_url(_EMULATOR_BASE_URL):
+            return await openrouter._resolve_emulator_model(_RESOLVE_FALLBACK)
+    finally:
+        openrouter.invalidate_emulator_model_cache()
+
+
+@pytest.fixture
+def captured_titles(monkeypatch):
+    """Stub out the DB side of title generation; returns the titles saved, keyed by conversation id."""
+    from unittest.mock import MagicMock
+    titles = {}
+
+    def _update(db, conv_id, title):
+        titles[conv_id] = title
+
+    monkeypatch.setattr("services.history.update_conversation_title", _update)
+    monkeypatch.setattr("database.SessionLocal", MagicMock())
+    return titles
+
+
+def _prime_emulator_model_cache(monkeypatch, resolved: str):
+    """Seed the service's model cache for one test so no /models lookup is repeated.
+
+    Going through monkeypatch means whatever the test leaves in the cache is undone afterwards.
+    """
+    monkeypatch.setattr(
+        openrouter, "_emulator_model_cache",
+        resolved if resolved != _RESOLVE_FALLBACK else None,
+    )
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -219,9 +322,9 @@ class TestOpenRouterRandomModels:
     """Chat completions with 5 randomly selected models via OpenRouter API."""
 
     @pytest.mark.asyncio
-    async def test_streaming_chat_5_random_models(self, api_key, random_models):
+    async def test_streaming_chat_5_random_models(self, api_key, random_models, shared_http_client):
         """Each of 5 random models should return valid SSE with non-empty content."""
-        for model_id in random_models:
+        async def _probe(model_id: str) -> str:
             payload = {
                 "model": model_id,
                 "messages": [{"role": "user", "content": "Say 'hello' and nothing else."}],
@@ -229,13 +332,13 @@ class TestOpenRouterRandomModels:
                 "max_tokens": 30,
             }
             try:
-                chunks, full_text = await _collect_stream_response(
-                    api_key, f"{OPENROUTER_URL}/chat/completions", payload
+                chunks, full_text, flags = await _collect_stream_response(
+                    shared_http_client, api_key, f"{OPENROUTER_URL}/chat/completions", payload,
+                    early_stop=_has_visible_text,
                 )
             except Exception as e:
                 # Some models may be temporarily unavailable — record but continue
-                print(f"  ⚠ Model {model_id} errored: {e}")
-                continue
+                return f"  ⚠ Model {model_id} errored: {e}"
 
             # Validate SSE format
             assert len(chunks) > 0, f"Model {model_id} returned no SSE chunks!"
@@ -246,68 +349,57 @@ class TestOpenRouterRandomModels:
 
             # Some models return encrypted reasoning with empty content
             # (e.g., codex models). Check for that and count it as valid.
-            has_reasoning = any(
-                c.get("choices", [{}])[0].get("delta", {}).get("reasoning")
-                or c.get("choices", [{}])[0].get("delta", {}).get("reasoning_details")
-                for c in chunks
-            )
-            if has_reasoning and len(full_text.strip()) == 0:
-                print(f"  ✓ {model_id}: (encrypted reasoning, no visible content — acceptable)")
-                continue
+            if flags["has_reasoning"] and len(full_text.strip()) == 0:
+                return f"  ✓ {model_id}: (encrypted reasoning, no visible content — acceptable)"
 
             # Validate non-empty response (no empty bubbles)
             if len(full_text.strip()) == 0:
                 # Some models may temporarily return empty — log and continue
                 # This is a soft check because random models can be flaky
-                print(f"  ⚠ Model {model_id} returned empty content (may be a transient issue)")
-                continue
-            print(f"  ✓ {model_id}: '{full_text.strip()[:60]}'")
+                return f"  ⚠ Model {model_id} returned empty content (may be a transient issue)"
+            return f"  ✓ {model_id}: '{full_text.strip()[:60]}'"
+
+        await _run_model_probes(_probe, random_models)
 
     @pytest.mark.asyncio
-    async def test_non_streaming_chat_5_random_models(self, api_key, random_models):
+    async def test_non_streaming_chat_5_random_models(self, api_key, random_models, shared_http_client):
         """Each of 5 random models should return valid non-streaming response."""
-        for model_id in random_models:
+        async def _probe(model_id: str) -> str:
             payload = {
                 "model": model_id,
                 "messages": [{"role": "user", "content": "Reply with the word 'pong'."}],
                 "stream": False,
                 "max_tokens": 30,
             }
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "HTTP-Referer": "http://localhost:8000",
-                "X-Title": "Unified Test Suite",
-                "Content-Type": "application/json",
-            }
+            headers = {**_BASE_HEADERS, "Authorization": f"Bearer {api_key}"}
             try:
-                async with httpx.AsyncClient() as client:
-                    resp = await client.post(
-                        f"{OPENROUTER_URL}/chat/completions",
-                        headers=headers, json=payload, timeout=60.0
-                    )
+                resp = await shared_http_client.post(
+                    f"{OPENROUTER_URL}/chat/completions",
+                    headers=headers, json=payload, timeout=60.0
+                )
             except Exception as e:
-                print(f"  ⚠ Model {model_id} errored: {e}")
-                continue
+                return f"  ⚠ Model {model_id} errored: {e}"
 
             if resp.status_code != 200:
-                print(f"  ⚠ Model {model_id} returned status {resp.status_code}")
-                continue
+                return f"  ⚠ Model {model_id} returned status {resp.status_code}"
 
-            data = resp.json()
+            data = _rjson(resp)
             assert "choices" in data, f"Model {model_id}: response missing 'choices'"
             content = data["choices"][0]["message"].get("content", "") or ""
             assert isinstance(content, str), f"Model {model_id}: content is not a string"
             if len(content.strip()) == 0:
                 # Some models may return empty content (e.g., reasoning-only or content moderation)
-                print(f"  ⚠ Model {model_id} returned empty content (may be transient)")
-                continue
-            print(f"  ✓ {model_id}: '{content.strip()[:60]}'")
+                return f"  ⚠ Model {model_id} returned empty content (may be transient)"
+            return f"  ✓ {model_id}: '{content.strip()[:60]}'"
+
+        await _run_model_probes(_probe, random_models)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # SECTION 2: OpenRouter — Thinking Mode
 # ══════════════════════════════════════════════════════════════════════════════
 
+@pytest.mark.usefixtures("openrouter_base_url")
 class TestOpenRouterThinking:
     """Tests that thinking mode produces <think> tags or reasoning content."""
 
@@ -315,86 +407,72 @@ class TestOpenRouterThinking:
     async def test_thinking_mode_via_service(self, api_key):
         """Using mode='thinking' via generate_chat_openrouter should produce think tags."""
         # Use a model known to support the thinking system prompt
-        original_url = settings.get_llm_base_url()
-        settings.set_llm_base_url("https://openrouter.ai/api/v1")
-        try:
-            req = ChatRequest(
-                model="openai/gpt-4o-mini",
-                messages=[Message(role="user", content="What is 15 * 23? Show your reasoning step by step.")],
-                mode="thinking",
-            )
-            raw_chunks, full_text = await _collect_generator_response(
-                generate_chat_openrouter(req, offline_mode=False)
-            )
+        req = ChatRequest(
+            model="openai/gpt-4o-mini",
+            messages=[Message(role="user", content="What is 15 * 23? Show your reasoning step by step.")],
+            mode="thinking",
+        )
+        _, full_text, _ = await _collect_generator_response(
+            generate_chat_openrouter(req, offline_mode=False)
+        )
 
-            assert len(full_text.strip()) > 0, "Thinking mode returned empty response!"
-            # The service should inject <think> tags via system prompt
-            # The model should follow and produce them
-            has_think = "<think>" in full_text
-            has_reasoning = any(kw in full_text.lower() for kw in ["step", "multiply", "15", "23", "345"])
-            assert has_think or has_reasoning, (
-                f"Thinking mode response had neither <think> tags nor visible reasoning. "
-                f"Response: {full_text[:300]}"
-            )
-            print(f"  ✓ Thinking mode response (first 200 chars): {full_text[:200]}")
-        finally:
-            settings.set_llm_base_url(original_url)
+        assert len(full_text.strip()) > 0, "Thinking mode returned empty response!"
+        # The service should inject <think> tags via system prompt
+        # The model should follow and produce them
+        has_think = "<think>" in full_text
+        has_reasoning = any(kw in full_text.lower() for kw in ["step", "multiply", "15", "23", "345"])
+        assert has_think or has_reasoning, (
+            f"Thinking mode response had neither <think> tags nor visible reasoning. "
+            f"Response: {full_text[:300]}"
+        )
+        print(f"  ✓ Thinking mode response (first 200 chars): {full_text[:200]}")
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # SECTION 3: OpenRouter — Web Search
 # ══════════════════════════════════════════════════════════════════════════════
 
+@pytest.mark.usefixtures("openrouter_base_url")
 class TestOpenRouterWebSearch:
     """Tests that web search tool invocation works end-to-end."""
 
     @pytest.mark.asyncio
     async def test_web_search_invocation(self, api_key):
         """When asked a current-events question, the service should invoke web_search."""
-        original_url = settings.get_llm_base_url()
-        settings.set_llm_base_url("https://openrouter.ai/api/v1")
-        try:
-            req = ChatRequest(
-                model="openai/gpt-4o-mini",
-                messages=[Message(role="user", content="What is the current price of Bitcoin right now? Please search the web.")],
-            )
-            raw_chunks, full_text = await _collect_generator_response(
-                generate_chat_openrouter(req, offline_mode=False)
-            )
+        req = ChatRequest(
+            model="openai/gpt-4o-mini",
+            messages=[Message(role="user", content="What is the current price of Bitcoin right now? Please search the web.")],
+        )
+        raw_chunks, full_text, hit = await _collect_generator_response(
+            generate_chat_openrouter(req, offline_mode=False),
+            needles=("Searching the Web",),
+        )
 
-            # The service should yield a "Searching the Web" indicator
-            all_text = " ".join(raw_chunks)
-            assert "Searching the Web" in all_text, (
-                f"Web search was NOT invoked! The model should have used the web_search tool. "
-                f"Full output: {all_text[:500]}"
-            )
+        # The service should yield a "Searching the Web" indicator
+        assert "Searching the Web" in hit, (
+            f"Web search was NOT invoked! The model should have used the web_search tool. "
+            f"First chunks: {raw_chunks[:5]}"
+        )
 
-            assert len(full_text.strip()) > 0, "Web search returned empty final response!"
-            print(f"  ✓ Web search invoked. Response contains: {full_text[:200]}")
-        finally:
-            settings.set_llm_base_url(original_url)
+        assert len(full_text.strip()) > 0, "Web search returned empty final response!"
+        print(f"  ✓ Web search invoked. Response contains: {full_text[:200]}")
 
     @pytest.mark.asyncio
     async def test_web_search_blocked_in_offline_mode(self, api_key):
         """In offline mode, web search should NEVER be invoked."""
-        original_url = settings.get_llm_base_url()
-        settings.set_llm_base_url("https://openrouter.ai/api/v1")
-        try:
-            req = ChatRequest(
-                model="openai/gpt-4o-mini",
-                messages=[Message(role="user", content="Search the web for Bitcoin price!")],
-            )
-            raw_chunks, full_text = await _collect_generator_response(
-                generate_chat_openrouter(req, offline_mode=True)
-            )
+        req = ChatRequest(
+            model="openai/gpt-4o-mini",
+            messages=[Message(role="user", content="Search the web for Bitcoin price!")],
+        )
+        _, full_text, hit = await _collect_generator_response(
+            generate_chat_openrouter(req, offline_mode=True),
+            needles=("Searching the Web",),
+        )
 
-            all_text = " ".join(raw_chunks)
-            assert "Searching the Web" not in all_text, (
-                "SECURITY BREACH: Web search was invoked in offline mode!"
-            )
-            assert len(full_text.strip()) > 0, "Offline mode returned empty response!"
-        finally:
-            settings.set_llm_base_url(original_url)
+        assert "Searching the Web" not in hit, (
+            "SECURITY BREACH: Web search was invoked in offline mode!"
+        )
+        assert len(full_text.strip()) > 0, "Offline mode returned empty response!"
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -405,14 +483,8 @@ class TestOpenRouterSkills:
     """Tests for the @generate_image skill."""
 
     @pytest.mark.asyncio
-    async def test_generate_image_skill_returns_result(self):
+    async def test_generate_image_skill_returns_result(self, mock_db):
         """@generate_image should return either a markdown image or a friendly error."""
-        from unittest.mock import MagicMock
-        mock_db = MagicMock()
-        from models.db_models import ConversationDB
-        mock_conv = ConversationDB(id="test_id", title="Test", messages=[])
-        mock_db.query().filter().first.return_value = mock_conv
-
         result = await skills.process_skills("@generate_image a beautiful sunset", mock_db, "test_id")
         assert result is not None, "process_skills returned None for @generate_image!"
         assert hasattr(result, "__aiter__"), "Skill result is not an async generator!"
@@ -447,52 +519,78 @@ class TestOpenRouterSkills:
 # SECTION 5: OpenRouter — Title Generation
 # ══════════════════════════════════════════════════════════════════════════════
 
+@pytest.mark.usefixtures("openrouter_base_url")
 class TestOpenRouterTitling:
     """Tests that conversation titles are generated correctly."""
 
     @pytest.mark.asyncio
-    async def test_title_generation_produces_result(self, api_key):
+    async def test_title_generation_produces_result(self, api_key, captured_titles):
         """Title generation should produce a non-empty, concise title."""
-        original_url = settings.get_llm_base_url()
-        settings.set_llm_base_url("https://openrouter.ai/api/v1")
-        try:
-            from unittest.mock import patch, MagicMock
+        await generate_title_background(
+            "What is the weather forecast for Tokyo this week?",
+            "test-conv-123",
+            "openai/gpt-4o-mini"
+        )
 
-            captured_title = {}
+        assert "test-conv-123" in captured_titles, "Title generation did not call update_conversation_title!"
+        title = captured_titles["test-conv-123"]
+        assert len(title.strip()) > 0, "Generated title is EMPTY!"
+        assert len(title) < 60, f"Title is too long ({len(title)} chars): '{title}'"
+        assert '"' not in title, f"Title contains unstripped quotes: '{title}'"
+        # STRICT: Titles MUST have spaces between words — this catches the spacing bug
+        words = title.strip().split()
+        assert len(words) >= 2, (
+            f"Title has no word separation (likely missing spaces)! "
+            f"Title: '{title}', words: {words}"
+        )
+        print(f"  ✓ Generated title: '{title}' ({len(words)} words)")
 
-            def mock_update_title(db, conv_id, title):
-                captured_title["value"] = title
 
-            with patch("services.history.update_conversation_title", side_effect=mock_update_title):
-                with patch("database.SessionLocal") as mock_session:
-                    mock_db = MagicMock()
-                    mock_session.return_value = mock_db
+# ══════════════════════════════════════════════════════════════════════════════
+# SECTION 6: Emulator Integration
+# ══════════════════════════════════════════════════════════════════════════════
 
-                    await generate_title_background(
-                        "What is the weather forecast for Tokyo this week?",
-                        "test-conv-123",
-                        "openai/gpt-4o-mini"
-                    )
+_EMULATOR_STREAM_PAYLOAD = {
+    "messages": [{"role": "user", "content": "Say 'hello' and nothing else."}],
+    "stream": True,
+    "max_tokens": 30,
+}
+_EMULATOR_NONSTREAM_PAYLOAD = {
+    "messages": [{"role": "user", "content": "What is 2+2? Reply with just the number."}],
+    "stream": False,
+    "max_tokens": 30,
+}
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def emulator_probes(emulator_model, shared_http_client):
+    """Runs the independent emulator round trips concurrently; each test asserts on its own result."""
+    stream, nonstream, models = await asyncio.gather(
+        _collect_stream_response(
+            shared_http_client,
+            "dummy-key",
+            f"{EMULATOR_URL}/chat/completions",
+            {"model": emulator_model, **_EMULATOR_STREAM_PAYLOAD},
+        ),
+        shared_http_client.post(
+            f"{EMULATOR_URL}/chat/completions",
+            headers={"Authorization": "Bearer dummy", "Content-Type": "application/json"},
+            json={"model": emulator_model, **_EMULATOR_NONSTREAM_PAYLOAD},
+            timeout=60.0,
+        ),
+        shared_http_client.get(f"{EMULATOR_URL}/models", timeout=10.0),
+        return_exceptions=True,
+    )
+    return {"stream": stream, "nonstream": nonstream, "models": models}
 
-            assert "value" in captured_title, "Title generation did not call update_conversation_title!"
-            title = captured_title["value"]
-            assert len(title.strip()) > 0, "Generated title is EMPTY!"
-            assert len(title) < 60, f"Title is too long ({len(title)} chars): '{title}'"
-            assert '"' not in title, f"Title contains unstripped quotes: '{title}'"
-            # STRICT: Titles MUST have spaces between words — this catches the spacing bug
-            words = title.strip().split()
-            assert len(words) >= 2, (
-                f"Title has no word separation (likely missing spaces)! "
-                f"Title: '{title}', words: {words}"
-            )
-            print(f"  ✓ Generated title: '{title}' ({len(words)} words)")
-        finally:
-            settings.set_llm_base_url(original_url)
 
+def _probe_result(probes: dict, name: str):
+    """Return one probe's result, re-raising it if the round trip failed."""
+    result = probes[name]
+    if isinstance(result, BaseException):
+        raise result
+    return result
 
-# ══════════════════════════════════════════════════════════════════════════════
-# SECTION 6: Emulator Integration
-# ══════════════════════════════════════════════════════════════════════════════
 
 class TestEmulatorIntegration:
     """Tests the emulator Docker container end-to-end."""
@@ -505,18 +603,9 @@ class TestEmulatorIntegration:
         print(f"  ✓ Emulator model: {emulator_model}")
 
     @pytest.mark.asyncio
-    async def test_emulator_streaming_chat(self, emulator_model):
+    async def test_emulator_streaming_chat(self, emulator_probes):
         """Emulator should return valid streaming SSE with non-empty content."""
-        chunks, full_text = await _collect_stream_response(
-            "dummy-key",
-            f"{EMULATOR_URL}/chat/completions",
-            {
-                "model": emulator_model,
-                "messages": [{"role": "user", "content": "Say 'hello' and nothing else."}],
-                "stream": True,
-                "max_tokens": 30,
-            },
-        )
+        chunks, full_text, _ = _probe_result(emulator_probes, "stream")
 
         assert len(chunks) > 0, "Emulator returned no SSE chunks!"
         assert len(full_text.strip()) > 0, (
@@ -532,22 +621,11 @@ class TestEmulatorIntegration:
         print(f"  ✓ Emulator chat response: '{full_text.strip()[:60]}'")
 
     @pytest.mark.asyncio
-    async def test_emulator_non_streaming_chat(self, emulator_model):
+    async def test_emulator_non_streaming_chat(self, emulator_probes):
         """Emulator should return valid non-streaming response."""
-        headers = {"Authorization": "Bearer dummy", "Content-Type": "application/json"}
-        payload = {
-            "model": emulator_model,
-            "messages": [{"role": "user", "content": "What is 2+2? Reply with just the number."}],
-            "stream": False,
-            "max_tokens": 30,
-        }
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                f"{EMULATOR_URL}/chat/completions",
-                headers=headers, json=payload, timeout=60.0
-            )
+        resp = _probe_result(emulator_probes, "nonstream")
         assert resp.status_code == 200, f"Emulator non-streaming failed: {resp.text}"
-        data = resp.json()
+        data = _rjson(resp)
         assert "choices" in data
         content = data["choices"][0]["message"]["content"]
         assert len(content.strip()) > 0, "Emulator non-streaming returned EMPTY content!"
@@ -555,32 +633,22 @@ class TestEmulatorIntegration:
         print(f"  ✓ Emulator non-streaming: '{content.strip()[:60]}'")
 
     @pytest.mark.asyncio
-    async def test_emulator_model_resolution_via_service(self, emulator_model):
+    async def test_emulator_model_resolution_via_service(self, resolved_emulator_model):
         """The backend service should auto-detect the emulator's loaded model."""
-        from services.openrouter import _resolve_emulator_model, invalidate_emulator_model_cache
-
-        original_url = settings.get_llm_base_url()
-        settings.set_llm_base_url(EMULATOR_URL.rsplit("/api/v1", 1)[0] + "/api/v1")
-        invalidate_emulator_model_cache()
-        try:
-            resolved = await _resolve_emulator_model("fallback-model")
-            assert resolved != "fallback-model", (
-                "Model resolution fell back! Should have detected the loaded model."
-            )
-            assert len(resolved) > 0
-            print(f"  ✓ Resolved model: {resolved}")
-        finally:
-            settings.set_llm_base_url(original_url)
-            invalidate_emulator_model_cache()
+        resolved = resolved_emulator_model
+        assert resolved != _RESOLVE_FALLBACK, (
+            "Model resolution fell back! Should have detected the loaded model."
+        )
+        assert len(resolved) > 0
+        print(f"  ✓ Resolved model: {resolved}")
 
     @pytest.mark.asyncio
-    async def test_emulator_models_endpoint_format(self, emulator_model):
+    async def test_emulator_models_endpoint_format(self, emulator_probes):
         """GET /api/v1/models should return OpenRouter-compatible format."""
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{EMULATOR_URL}/models", timeout=10.0)
+        resp = _probe_result(emulator_probes, "models")
 
         assert resp.status_code == 200
-        data = resp.json()
+        data = _rjson(resp)
         assert "data" in data, "Response missing 'data' key!"
         assert isinstance(data["data"], list)
         assert len(data["data"]) > 0
@@ -601,19 +669,16 @@ class TestEmulatorThinking:
     """Tests thinking mode through the emulator."""
 
     @pytest.mark.asyncio
-    async def test_thinking_mode_via_emulator(self, emulator_model):
+    async def test_thinking_mode_via_emulator(self, resolved_emulator_model, monkeypatch):
         """Using mode='thinking' with the emulator service should produce some response."""
-        original_url = settings.get_llm_base_url()
-        settings.set_llm_base_url(EMULATOR_URL.rsplit("/api/v1", 1)[0] + "/api/v1")
-        from services.openrouter import invalidate_emulator_model_cache
-        invalidate_emulator_model_cache()
-        try:
+        _prime_emulator_model_cache(monkeypatch, resolved_emulator_model)
+        with _override_llm_base_url(_EMULATOR_BASE_URL):
             req = ChatRequest(
                 model="any-model",
                 messages=[Message(role="user", content="What is 5+3? Show your work.")],
                 mode="thinking",
             )
-            raw_chunks, full_text = await _collect_generator_response(
+            _, full_text, _ = await _collect_generator_response(
                 generate_chat_openrouter(req, offline_mode=True)
             )
 
@@ -622,9 +687,6 @@ class TestEmulatorThinking:
                 "This would create an empty chat bubble."
             )
             print(f"  ✓ Emulator thinking response: '{full_text.strip()[:200]}'")
-        finally:
-            settings.set_llm_base_url(original_url)
-            invalidate_emulator_model_cache()
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -635,139 +697,132 @@ class TestFullStackEndToEnd:
     """Routes through the FastAPI app and validates the full pipeline."""
 
     @pytest.mark.asyncio
-    async def test_chat_endpoint_creates_conversation_and_streams(self):
+    async def test_chat_endpoint_creates_conversation_and_streams(self, asgi_client):
         """POST /chat should create a conversation, return SSE, and persist to DB."""
-        from unittest.mock import patch, AsyncMock
+        from unittest.mock import patch
 
         async def mock_generator(*args, **kwargs):
-            yield f'data: {json.dumps({"choices": [{"delta": {"content": "Hello from test!"}}]})}\n\n'
+            yield _MOCK_HELLO_SSE
 
         with patch("services.openrouter.generate_chat_openrouter", return_value=mock_generator()):
-            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-                res = await client.post("/chat", json={
-                    "messages": [{"role": "user", "content": "Test message"}],
-                    "model": "test-model",
-                    "mode": "auto",
-                })
-
-                assert res.status_code == 200
-                assert "text/event-stream" in res.headers["content-type"]
-                conv_id = res.headers.get("x-conversation-id")
-                assert conv_id is not None, "Missing x-conversation-id header!"
-
-                # Verify conversation was saved
-                history_res = await client.get(f"/chat/conversations/{conv_id}")
-                assert history_res.status_code == 200
-                data = history_res.json()
-                assert data["id"] == conv_id
-                assert len(data["messages"]) > 0
-                assert data["messages"][0]["content"] == "Test message"
+            res = await asgi_client.post("/chat", json={
+                "messages": [{"role": "user", "content": "Test message"}],
+                "model": "test-model",
+                "mode": "auto",
+            })
 
-    @pytest.mark.asyncio
-    async def test_models_endpoint_returns_valid_list(self):
-        """GET /models should return a non-empty list with required fields."""
-        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-            res = await client.get("/models")
             assert res.status_code == 200
-            models = res.json()
-            assert isinstance(models, list)
-            assert len(models) >= 1, "Models endpoint returned empty list!"
+            assert "text/event-stream" in res.headers["content-type"]
+            conv_id = res.headers.get("x-conversation-id")
+            assert conv_id is not None, "Missing x-conversation-id header!"
+
+            # Verify conversation was saved
+            history_res = await asgi_client.get(f"/chat/conversations/{conv_id}")
+            assert history_res.status_code == 200
+            data = _rjson(history_res)
+            assert data["id"] == conv_id
+            assert len(data["messages"]) > 0
+            assert data["messages"][0]["content"] == "Test message"
 
-            for m in models:
-                assert "id" in m, f"Model missing 'id': {m}"
-                assert "name" in m, f"Model missing 'name': {m}"
-                assert "provider" in m, f"Model missing 'provider': {m}"
-                assert m["provider"] in ("INTERNAL", "OPENROUTER"), (
-                    f"Invalid provider label '{m['provider']}' for model {m['id']}"
-                )
-                # Name should be prettified, not raw paths
-                assert "/app/model_cache" not in m["name"], (
-                    f"Model name contains raw path: {m['name']}"
-                )
+    @pytest.mark.asyncio
+    async def test_models_endpoint_returns_valid_list(self, asgi_client):
+        """GET /models should return a non-empty list with required fields."""
+        res = await asgi_client.get("/models")
+        assert res.status_code == 200
+        models = _rjson(res)
+        assert isinstance(models, list)
+        assert len(models) >= 1, "Models endpoint returned empty list!"
+
+        for m in models:
+            assert "id" in m, f"Model missing 'id': {m}"
+            assert "name" in m, f"Model missing 'name': {m}"
+            assert "provider" in m, f"Model missing 'provider': {m}"
+            assert m["provider"] in ("INTERNAL", "OPENROUTER"), (
+                f"Invalid provider label '{m['provider']}' for model {m['id']}"
+            )
+            # Name should be prettified, not raw paths
+            assert "/app/model_cache" not in m["name"], (
+                f"Model name contains raw path: {m['name']}"
+            )
 
     @pytest.mark.asyncio
-    async def test_settings_endpoints_work(self):
+    async def test_settings_endpoints_work(self, asgi_client):
         """GET/PUT /settings/* should work correctly."""
-        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-            # Network mode
-            res = await client.get("/settings/network-mode")
-            assert res.status_code == 200
-            assert "enabled" in res.json()
-
-            # API key status
-            res = await client.get("/settings/api-key-status")
-            assert res.status_code == 200
-            data = res.json()
-            assert "is_locked" in data
-            assert "valid" in data
-
-            # Provider toggle
-            res = await client.get("/settings/llm-provider")
-            assert res.status_code == 200
-            data = res.json()
-            assert "provider" in data
-            assert data["provider"] in ("emulator", "openrouter")
+        # Network mode
+        res = await asgi_client.get("/settings/network-mode")
+        assert res.status_code == 200
+        assert "enabled" in _rjson(res)
+
+        # API key status
+        res = await asgi_client.get("/settings/api-key-status")
+        assert res.status_code == 200
+        data = _rjson(res)
+        assert "is_locked" in data
+        assert "valid" in data
+
+        # Provider toggle
+        res = await asgi_client.get("/settings/llm-provider")
+        assert res.status_code == 200
+        data = _rjson(res)
+        assert "provider" in data
+        assert data["provider"] in ("emulator", "openrouter")
 
     @pytest.mark.asyncio
-    async def test_conversation_crud(self):
+    async def test_conversation_crud(self, asgi_client):
         """Create, read, list, delete conversations via API."""
         from unittest.mock import patch
 
         async def mock_gen(*args, **kwargs):
-            yield f'data: {json.dumps({"choices": [{"delta": {"content": "CRUD test"}}]})}\n\n'
+            yield _MOCK_CRUD_SSE
 
         with patch("services.openrouter.generate_chat_openrouter", return_value=mock_gen()):
-            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-                # Create
-                res = await client.post("/chat", json={
-                    "messages": [{"role": "user", "content": "CRUD test message"}],
-                    "model": "test-model",
-                    "mode": "auto",
-                })
-                conv_id = res.headers.get("x-conversation-id")
-                assert conv_id
-
-                # Read
-                res = await client.get(f"/chat/conversations/{conv_id}")
-                assert res.status_code == 200
-                assert res.json()["id"] == conv_id
-
-                # List
-                res = await client.get("/chat/conversations")
-                assert res.status_code == 200
-                conv_ids = [c["id"] for c in res.json()]
-                assert conv_id in conv_ids
+            # Create
+            res = await asgi_client.post("/chat", json={
+                "messages": [{"role": "user", "content": "CRUD test message"}],
+                "model": "test-model",
+                "mode": "auto",
+            })
+            conv_id = res.headers.get("x-conversation-id")
+            assert conv_id
+
+            # Read
+            res = await asgi_client.get(f"/chat/conversations/{conv_id}")
+            assert res.status_code == 200
+            assert _rjson(res)["id"] == conv_id
+
+            # List
+            res = await asgi_client.get("/chat/conversations")
+            assert res.status_code == 200
+            conv_ids = [c["id"] for c in _rjson(res)]
+            assert conv_id in conv_ids
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # SECTION 9: Result Correctness
 # ══════════════════════════════════════════════════════════════════════════════
 
+@pytest.mark.usefixtures("openrouter_base_url")
 class TestResultCorrectness:
     """Validates that model responses are actually correct, not just non-empty."""
 
     @pytest.mark.asyncio
     async def test_math_answer_correctness(self, api_key):
         """Models should correctly answer simple math questions."""
-        original_url = settings.get_llm_base_url()
-        settings.set_llm_base_url("https://openrouter.ai/api/v1")
-        try:
-            req = ChatRequest(
-                model="openai/gpt-4o-mini",
-                messages=[Message(role="user", content="What is 7 * 8? Reply with ONLY the number, nothing else.")],
-                mode="fast",
-            )
-            _, full_text = await _collect_generator_response(
-                generate_chat_openrouter(req, offline_mode=False)
-            )
-            assert "56" in full_text, f"Model gave wrong answer to 7*8! Got: '{full_text}'"
-        finally:
-            settings.set_llm_base_url(original_url)
+        req = ChatRequest(
+            model="openai/gpt-4o-mini",
+            messages=[Message(role="user", content="What is 7 * 8? Reply with ONLY the number, nothing else.")],
+            mode="fast",
+        )
+        _, full_text, _ = await _collect_generator_response(
+            generate_chat_openrouter(req, offline_mode=False)
+        )
+        assert "56" in full_text, f"Model gave wrong answer to 7*8! Got: '{full_text}'"
 
     @pytest.mark.asyncio
-    async def test_emulator_basic_response(self, emulator_model):
+    async def test_emulator_basic_response(self, emulator_model, shared_http_client):
         """Emulator should produce coherent, non-garbage text."""
-        chunks, full_text = await _collect_stream_response(
+        chunks, full_text, _ = await _collect_stream_response(
+            shared_http_client,
             "dummy-key",
             f"{EMULATOR_URL}/chat/completions",
             {
@@ -780,7 +835,7 @@ class TestResultCorrectness:
         # Should have some recognizable content
         assert len(full_text.strip()) > 0, "Emulator returned empty response!"
         # The text should be actual text, not garbage bytes
-        assert any(c.isalpha() for c in full_text), (
+        assert _HAS_ALPHA_RE.search(full_text) is not None, (
             f"Emulator response contains no alphabetic characters: '{full_text}'"
         )
 
@@ -789,58 +844,94 @@ class TestResultCorrectness:
 # SECTION 10: Empty Bubble Protection
 # ══════════════════════════════════════════════════════════════════════════════
 
+# Shared bases for the empty-bubble checks; each run only swaps the mode or prompt
+_EMPTY_BUBBLE_CHAT_REQ = ChatRequest(
+    model="openai/gpt-4o-mini",
+    messages=[Message(role="user", content="Hello, how are you?")],
+)
+_EMPTY_BUBBLE_EMULATOR_PAYLOAD = {
+    "stream": True,
+    "max_tokens": 50,
+}
+
+
+@pytest.mark.usefixtures("openrouter_base_url")
 class TestEmptyBubbleProtection:
     """Ensures no feature produces empty/whitespace-only chat bubbles."""
 
     @pytest.mark.asyncio
     async def test_regular_chat_never_empty(self, api_key):
         """Regular chat should never produce empty bubbles."""
-        original_url = settings.get_llm_base_url()
-        settings.set_llm_base_url("https://openrouter.ai/api/v1")
-        try:
-            for mode in ["auto", "fast", "thinking", "pro"]:
-                req = ChatRequest(
-                    model="openai/gpt-4o-mini",
-                    messages=[Message(role="user", content="Hello, how are you?")],
-                    mode=mode,
-                )
-                _, full_text = await _collect_generator_response(
-                    generate_chat_openrouter(req, offline_mode=False)
-                )
-                assert len(full_text.strip()) > 0, (
-                    f"Mode '{mode}' produced an EMPTY response! This would show as an empty bubble."
-                )
-                print(f"  ✓ Mode '{mode}': {len(full_text)} chars")
-        finally:
-            settings.set_llm_base_url(original_url)
+        lengths = []
+        for mode in ["auto", "fast", "thinking", "pro"]:
+            req = _EMPTY_BUBBLE_CHAT_REQ.model_copy(update={"mode": mode})
+            _, full_text, _ = await _collect_generator_response(
+                generate_chat_openrouter(req, offline_mode=False)
+            )
+            assert len(full_text.strip()) > 0, (
+                f"Mode '{mode}' produced an EMPTY response! This would show as an empty bubble."
+            )
+            lengths.append((mode, len(full_text)))
+        print("\n".join(f"  ✓ Mode '{m}': {n} chars" for m, n in lengths))
 
     @pytest.mark.asyncio
-    async def test_emulator_chat_never_empty(self, emulator_model):
+    async def test_emulator_chat_never_empty(self, emulator_model, shared_http_client):
         """Emulator chat should never produce empty bubbles."""
-        for prompt in [
+        prompts = [
             "Hello!",
             "What is Python?",
             "Tell me a joke.",
-        ]:
-            chunks, full_text = await _collect_stream_response(
+        ]
+
+        async def _one(prompt: str):
+            return await _collect_stream_response(
+                shared_http_client,
                 "dummy-key",
                 f"{EMULATOR_URL}/chat/completions",
                 {
+                    **_EMPTY_BUBBLE_EMULATOR_PAYLOAD,
                     "model": emulator_model,
                     "messages": [{"role": "user", "content": prompt}],
-                    "stream": True,
-                    "max_tokens": 50,
                 },
+                early_stop=_has_visible_text,
             )
+
+        # The prompts are independent, so they stream concurrently
+        results = await asyncio.gather(*(_one(p) for p in prompts))
+        for prompt, (_, full_text, _) in zip(prompts, results):
             assert len(full_text.strip()) > 0, (
                 f"Emulator returned empty for prompt '{prompt}'! This creates an empty bubble."
             )
 
-
 # ══════════════════════════════════════════════════════════════════════════════
 # SECTION 11: Markdown / Rendering Pipeline
 # ══════════════════════════════════════════════════════════════════════════════
 
+# Sample assistant content for the markdown pass-through checks below
+_CONTENT_CODE_BLOCK = "Here is code:\n```python\ndef hello():\n    print('hello')\n```\nDone."
+_CONTENT_BOLD_ITALIC = "This is **bold** and *italic* text."
+_CONTENT_LISTS = "- Item 1\n- Item 2\n1. First\n2. Second"
+_CONTENT_LINK = "Visit [Google](https://google.com) for more."
+_CONTENT_HEADINGS = "# Title\n## Subtitle\n### Section"
+_CONTENT_INLINE_CODE = "Use `print()` to output text."
+_CONTENT_BLOCKQUOTE = "> ⚠️ Error: Something went wrong"
+_CONTENT_IMAGE = "![Generated Image](https://example.com/image.jpg)\n*a cool cat*"
+_CONTENT_SEARCH_INDICATOR = '\n\n> 🔍 **Searching the Web**: `bitcoin price`...\n\n'
+
+# Markers each multi-part sample above must keep intact
+_REQUIRED_CODE_BLOCK_TOKENS = ("```python", "def hello():", "```")
+_REQUIRED_BOLD_ITALIC_TOKENS = ("**bold**", "*italic*")
+_REQUIRED_LIST_TOKENS = ("- Item 1", "1. First")
+_REQUIRED_HEADING_TOKENS = ("# Title", "## Subtitle")
+_REQUIRED_IMAGE_TOKENS = ("![Generated Image]", "https://example.com/image.jpg")
+_REQUIRED_SEARCH_INDICATOR_TOKENS = ("🔍", "**Searching the Web**", "`bitcoin price`")
+
+
+def _missing_tokens(content: str, tokens: tuple[str, ...]) -> list[str]:
+    """Return the tokens that do not occur in content, in declaration order."""
+    return [t for t in tokens if t not in content]
+
+
 class TestMarkdownRendering:
     """
     Tests the backend's markdown preprocessing and content formatting.
@@ -852,13 +943,12 @@ class TestMarkdownRendering:
         """The <think> tag preprocessing should work correctly."""
         # Simulate the MarkdownRenderer's preprocessMarkdown logic
         content = "<think>Let me reason about this.</think>\nThe answer is 42."
-        think_regex = re.compile(r"<think>([\s\S]*?)</think>")
-        match = think_regex.search(content)
+        match = _THINK_RE.search(content)
         assert match is not None, "Think tag regex failed to match!"
         assert "Let me reason about this." in match.group(1)
 
         # After replacement, we should have details/summary HTML
-        processed = think_regex.sub(
+        processed = _THINK_RE.sub(
             lambda m: f'<details><summary>Thinking Process</summary><div>{m.group(1).strip()}</div></details>',
             content,
         )
@@ -869,24 +959,17 @@ class TestMarkdownRendering:
     def test_unclosed_think_tag_handled_gracefully(self):
         """An unclosed <think> tag (during streaming) should not crash."""
         content = "<think>Still thinking about something..."
-        # This regex matches unclosed think tags
-        open_think_regex = re.compile(r"<think>(?!.*</think>)([\s\S]*)$", re.IGNORECASE)
-        match = open_think_regex.search(content)
+        # _OPEN_THINK_RE matches unclosed think tags
+        match = _OPEN_THINK_RE.search(content)
         assert match is not None, "Unclosed think tag regex failed!"
         assert "Still thinking" in match.group(1)
 
     def test_dsml_tags_are_scrubbed(self):
         """DeepSeek's leaked DSML tags should be removed from content."""
         content = 'Hello <| DSML |function_calls><| DSML |function_call>search()</| DSML |function_call></| DSML |function_calls> world'
-        # The frontend regex matches from opening DSML through the closing function_calls tag
-        dsml_regex = re.compile(
-            r'<\s*\|\s*DSML\s*\|[\s\S]*?<\s*/\s*\|\s*DSML\s*\|\s*function_calls\s*>',
-            re.IGNORECASE,
-        )
-        cleaned = dsml_regex.sub("", content)
-        # Also clean partial/dangling DSML tags (as the frontend does)
-        partial_dsml = re.compile(r'<\s*\|\s*DSML\s*\|[\s\S]*$', re.IGNORECASE)
-        cleaned = partial_dsml.sub("", cleaned)
+        # One pass removes full blocks (opening DSML through the closing function_calls
+        # tag) and any partial/dangling DSML tail, as the frontend does
+        cleaned = _DSML_RE.sub("", content)
         assert "DSML" not in cleaned, f"DSML tags not scrubbed: '{cleaned}'"
         assert "Hello" in cleaned
         assert "world" in cleaned
@@ -894,83 +977,68 @@ class TestMarkdownRendering:
     def test_latex_block_delimiters_converted(self):
         r"""LaTeX \\[ ... \\] should be converted to $$ ... $$ for remark-math."""
         content = r"Equation: \[ E = mc^2 \] and inline \( x=2 \)"
-        processed = content.replace("\\[", "$$").replace("\\]", "$$")
-        processed = processed.replace("\\(", "$").replace("\\)", "$")
+        processed = _LATEX_DELIM_RE.sub(lambda m: _LATEX_DELIM_MAP[m.group(1)], content)
         assert "$$" in processed
         assert "$ x=2 $" in processed or "$x=2$" in processed
 
     def test_code_blocks_preserved(self):
         """Fenced code blocks should pass through without mangling."""
-        content = "Here is code:\n```python\ndef hello():\n    print('hello')\n```\nDone."
         # Code blocks should be preserved as-is in markdown
-        assert "```python" in content
-        assert "def hello():" in content
-        assert "```" in content
+        missing = _missing_tokens(_CONTENT_CODE_BLOCK, _REQUIRED_CODE_BLOCK_TOKENS)
+        assert not missing, f"Missing: {missing}"
 
     def test_markdown_bold_italic_preserved(self):
         """Bold and italic markers should be preserved in content."""
-        content = "This is **bold** and *italic* text."
-        assert "**bold**" in content
-        assert "*italic*" in content
+        missing = _missing_tokens(_CONTENT_BOLD_ITALIC, _REQUIRED_BOLD_ITALIC_TOKENS)
+        assert not missing, f"Missing: {missing}"
 
     def test_markdown_lists_preserved(self):
         """Ordered and unordered lists should be preserved."""
-        content = "- Item 1\n- Item 2\n1. First\n2. Second"
-        assert "- Item 1" in content
-        assert "1. First" in content
+        missing = _missing_tokens(_CONTENT_LISTS, _REQUIRED_LIST_TOKENS)
+        assert not missing, f"Missing: {missing}"
 
     def test_markdown_links_preserved(self):
         """Markdown links should be preserved."""
-        content = "Visit [Google](https://google.com) for more."
-        assert "[Google](https://google.com)" in content
+        assert "[Google](https://google.com)" in _CONTENT_LINK
 
     def test_markdown_headings_preserved(self):
         """Markdown headings should be preserved."""
-        content = "# Title\n## Subtitle\n### Section"
-        assert "# Title" in content
-        assert "## Subtitle" in content
+        missing = _missing_tokens(_CONTENT_HEADINGS, _REQUIRED_HEADING_TOKENS)
+        assert not missing, f"Missing: {missing}"
 
     def test_inline_code_preserved(self):
         """Inline code with backticks should be preserved."""
-        content = "Use `print()` to output text."
-        assert "`print()`" in content
+        assert "`print()`" in _CONTENT_INLINE_CODE
 
     def test_blockquote_preserved(self):
         """Blockquotes should be preserved (used for error messages)."""
-        content = "> ⚠️ Error: Something went wrong"
-        assert "> ⚠️ Error:" in content
+        assert "> ⚠️ Error:" in _CONTENT_BLOCKQUOTE
 
     def test_image_markdown_preserved(self):
         """Image markdown syntax should be correctly structured."""
-        content = "![Generated Image](https://example.com/image.jpg)\n*a cool cat*"
-        assert "![Generated Image]" in content
-        assert "https://example.com/image.jpg" in content
+        missing = _missing_tokens(_CONTENT_IMAGE, _REQUIRED_IMAGE_TOKENS)
+        assert not missing, f"Missing: {missing}"
 
     def test_search_indicator_markdown_format(self):
         """The web search indicator should be proper markdown."""
-        search_msg = '\n\n> 🔍 **Searching the Web**: `bitcoin price`...\n\n'
-        assert "🔍" in search_msg
-        assert "**Searching the Web**" in search_msg
-        assert "`bitcoin price`" in search_msg
+        missing = _missing_tokens(_CONTENT_SEARCH_INDICATOR, _REQUIRED_SEARCH_INDICATOR_TOKENS)
+        assert not missing, f"Missing: {missing}"
 
     def test_no_double_escaped_newlines_in_sse(self):
         r"""SSE chunks should not contain literal \\n strings (double-escaped newlines)."""
-        # Simulate a proper SSE chunk
-        chunk_data = {"choices": [{"delta": {"content": "Line 1\nLine 2"}}]}
-        serialized = json.dumps(chunk_data)
-        # After JSON serialization, newlines become \n in the JSON string
-        # But after JSON parsing, they should be actual newline characters
-        parsed = json.loads(serialized)
-        text = parsed["choices"][0]["delta"]["content"]
+        # Build the frame the same way the mocked chat generators do
+        frame = _sse_frame("Line 1\nLine 2")
+        # On the wire the newline is escaped, so the frame holds a single data line
+        (match,) = _SSE_DATA_LINE_RE.finditer(frame)
+        # But after JSON parsing, it should be an actual newline character
+        text = _delta_content(orjson.loads(match.group(1)))
         assert "\\n" not in text, f"Found double-escaped newline in content: {repr(text)}"
         assert "\n" in text, "Real newline should be present after JSON decode"
 
     def test_error_messages_are_user_friendly(self):
         """Error messages should not contain raw HTTP codes or stack traces."""
-        # Simulate the error format
-        error_chunk = json.dumps({"error": "Failed to generate image. Please try again."})
-        parsed = json.loads(error_chunk)
-        error_msg = parsed["error"]
+        # Simulate the user-facing error message
+        error_msg = "Failed to generate image. Please try again."
         # Should not contain HTTP codes
         assert "530" not in error_msg
         assert "HTTP" not in error_msg
@@ -985,46 +1053,43 @@ class TestProviderConsistency:
     """Tests that provider toggling doesn't break model listing or labels."""
 
     @pytest.mark.asyncio
-    async def test_provider_toggle_roundtrip(self):
+    async def test_provider_toggle_roundtrip(self, asgi_client, original_llm_base_url):
         """Toggling providers should round-trip cleanly."""
-        original_url = settings.get_llm_base_url()
         try:
-            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-                # Get initial state
-                res = await client.get("/settings/llm-provider")
-                initial = res.json()["provider"]
-
-                # Toggle to openrouter
-                res = await client.put("/settings/llm-provider", json={"provider": "openrouter"})
-                assert res.status_code == 200
-                assert res.json()["provider"] == "openrouter"
-
-                # Models should return valid data
-                res = await client.get("/models")
-                assert res.status_code == 200
-                models = res.json()
-                assert len(models) >= 1
-                for m in models:
-                    assert m["provider"] == "OPENROUTER", (
-                        f"Model {m['id']} labeled {m['provider']} in OpenRouter mode!"
-                    )
+            # Get initial state
+            res = await asgi_client.get("/settings/llm-provider")
+            initial = _rjson(res)["provider"]
+
+            # Toggle to openrouter
+            res = await asgi_client.put("/settings/llm-provider", json={"provider": "openrouter"})
+            assert res.status_code == 200
+            assert _rjson(res)["provider"] == "openrouter"
 
-                # Toggle to emulator
-                res = await client.put("/settings/llm-provider", json={"provider": "emulator"})
-                assert res.status_code == 200
-                assert res.json()["provider"] == "emulator"
+            # Models should return valid data
+            res = await asgi_client.get("/models")
+            assert res.status_code == 200
+            models = _rjson(res)
+            assert len(models) >= 1
+            for m in models:
+                assert m["provider"] == "OPENROUTER", (
+                    f"Model {m['id']} labeled {m['provider']} in OpenRouter mode!"
+                )
 
-                # Restore
-                await client.put("/settings/llm-provider", json={"provider": initial})
+            # Toggle to emulator
+            res = await asgi_client.put("/settings/llm-provider", json={"provider": "emulator"})
+            assert res.status_code == 200
+            assert _rjson(res)["provider"] == "emulator"
+
+            # Restore
+            await asgi_client.put("/settings/llm-provider", json={"provider": initial})
         finally:
-            settings.set_llm_base_url(original_url)
+            settings.set_llm_base_url(original_llm_base_url)
 
     @pytest.mark.asyncio
-    async def test_invalid_provider_rejected(self):
+    async def test_invalid_provider_rejected(self, asgi_client):
         """Invalid provider names should be rejected with 400."""
-        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-            res = await client.put("/settings/llm-provider", json={"provider": "invalid"})
-            assert res.status_code == 400
+        res = await asgi_client.put("/settings/llm-provider", json={"provider": "invalid"})
+        assert res.status_code == 400
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -1054,23 +1119,22 @@ class TestDuckDuckGoHealth:
 class TestApiKeySecurity:
     """Validates that the API key infrastructure works."""
 
-    def test_api_key_is_available(self):
+    def test_api_key_is_available(self, api_key):
         """The API key should always be extractable."""
-        key = _get_api_key()
+        key = api_key
         assert key is not None, "API key is None!"
         assert len(key) > 0, "API key is empty!"
         assert key.startswith("sk-or-v1-"), f"API key has wrong prefix: {key[:10]}..."
 
     @pytest.mark.asyncio
-    async def test_api_key_authenticates_with_openrouter(self):
+    async def test_api_key_authenticates_with_openrouter(self, api_key, shared_http_client):
         """The API key should be accepted by OpenRouter."""
-        key = _get_api_key()
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{OPENROUTER_URL}/auth/key",
-                headers={"Authorization": f"Bearer {key}"},
-                timeout=10.0,
-            )
+        key = api_key
+        resp = await shared_http_client.get(
+            f"{OPENROUTER_URL}/auth/key",
+            headers={"Authorization": f"Bearer {key}"},
+            timeout=10.0,
+        )
         assert resp.status_code == 200, (
             f"OpenRouter rejected our API key! Status: {resp.status_code}"
         )
@@ -1080,6 +1144,30 @@ class TestApiKeySecurity:
 # SECTION 15: Strict Per-Mode Tests Across Random Models
 # ══════════════════════════════════════════════════════════════════════════════
 
+# One validated request per mode; each model gets a model_copy() with its id swapped in
+_THINK_PROMPT_REQ = ChatRequest(
+    model="_placeholder",
+    messages=[Message(role="user", content="What is 15 * 23? Show your step-by-step reasoning.")],
+    mode="thinking",
+)
+_FAST_PROMPT_REQ = ChatRequest(
+    model="_placeholder",
+    messages=[Message(role="user", content="What is the capital of France?")],
+    mode="fast",
+)
+_PRO_PROMPT_REQ = ChatRequest(
+    model="_placeholder",
+    messages=[Message(role="user", content="Explain the difference between TCP and UDP protocols.")],
+    mode="pro",
+)
+_AUTO_PROMPT_REQ = ChatRequest(
+    model="_placeholder",
+    messages=[Message(role="user", content="Hello, how are you today?")],
+    mode="auto",
+)
+
+
+@pytest.mark.usefixtures("openrouter_base_url")
 class TestPerModeAllRandomModels:
     """
     Tests ALL 4 modes (auto, fast, thinking, pro) across the 5 randomly
@@ -1093,220 +1181,173 @@ class TestPerModeAllRandomModels:
         STRICT: Thinking mode MUST produce <think> tags with non-empty reasoning
         inside them. This is the user's #1 complaint — empty thinking sections.
         """
-        original_url = settings.get_llm_base_url()
-        settings.set_llm_base_url("https://openrouter.ai/api/v1")
         think_results = []
-        try:
-            for model_id in random_models:
-                try:
-                    req = ChatRequest(
-                        model=model_id,
-                        messages=[Message(role="user", content="What is 15 * 23? Show your step-by-step reasoning.")],
-                        mode="thinking",
-                    )
-                    raw_chunks, full_text = await _collect_generator_response(
-                        generate_chat_openrouter(req, offline_mode=False)
-                    )
-                except Exception as e:
-                    print(f"  ⚠ Model {model_id} errored in thinking mode: {e}")
-                    continue
-
-                if len(full_text.strip()) == 0:
-                    print(f"  ⚠ Model {model_id} returned empty in thinking mode")
-                    continue
-
-                # STRICT: The response MUST contain <think> tags (either from the model
-                # following instructions, or from the backend's enforcement fallback)
-                has_think_open = "<think>" in full_text
-                has_think_close = "</think>" in full_text
+        responses = await _gather_mode_responses(random_models, _THINK_PROMPT_REQ)
+        for model_id, full_text in responses:
+            if isinstance(full_text, BaseException):
+                print(f"  ⚠ Model {model_id} errored in thinking mode: {full_text}")
+                continue
+
+            if len(full_text.strip()) == 0:
+                print(f"  ⚠ Model {model_id} returned empty in thinking mode")
+                continue
+
+            # STRICT: The response MUST contain <think> tags (either from the model
+            # following instructions, or from the backend's enforcement fallback)
+            has_think_open = "<think>" in full_text
+            has_think_close = "</think>" in full_text
                 
-                # Extract what's inside the think tags - check for ALL matches
-                # and use the LAST one (the corrected one from backend if any)
-                think_content = ""
-                if has_think_open and has_think_close:
-                    think_matches = re.findall(r'<think>([\s\S]*?)</think>', full_text)
-                    if think_matches:
-                        # Use the last match which should be the most complete or corrected one
-                        think_content = think_matches[-1].strip()
-
-                result = {
-                    "model": model_id,
-                    "has_tags": len(think_matches) > 0 if 'think_matches' in locals() else False,
-                    "think_content_len": len(think_content),
-                    "total_len": len(full_text),
-                }
-                think_results.append(result)
-
-                # The post-stream fallback should ALWAYS ensure tags are present
-                assert has_think_open, (
-                    f"Model {model_id}: Thinking mode response MISSING <think> tag! "
-                    f"The backend enforcement should have caught this. "
-                    f"Response (first 300 chars): {full_text[:300]}"
-                )
-                assert has_think_close, (
-                    f"Model {model_id}: Thinking mode response has <think> but MISSING </think>! "
-                    f"Response (first 300 chars): {full_text[:300]}"
-                )
-                assert len(think_content) > 10, (
-                    f"Model {model_id}: Thinking section is EMPTY or trivially short! "
-                    f"Think content: '{think_content[:100]}'. "
-                    f"This creates an empty thinking accordion in the UI."
-                )
-                print(f"  ✓ {model_id}: thinking={len(think_content)} chars, total={len(full_text)} chars")
+            # Extract what's inside the LAST <think>...</think> pair (the corrected
+            # one from the backend, if any) by scanning back from the final close tag
+            last_close = full_text.rfind("</think>")
+            last_open = full_text.rfind("<think>", 0, last_close) if last_close != -1 else -1
+            has_tags = last_open != -1
+            think_content = (
+                full_text[last_open + len("<think>"):last_close].strip() if has_tags else ""
+            )
 
-            # At least 3 models should have succeeded
-            assert len(think_results) >= 3, (
-                f"Only {len(think_results)}/5 models produced results in thinking mode! "
-                f"Results: {think_results}"
+            result = {
+                "model": model_id,
+                "has_tags": has_tags,
+                "think_content_len": len(think_content),
+                "total_len": len(full_text),
+            }
+            think_results.append(result)
+
+            # The post-stream fallback should ALWAYS ensure tags are present
+            assert has_think_open, (
+                f"Model {model_id}: Thinking mode response MISSING <think> tag! "
+                f"The backend enforcement should have caught this. "
+                f"Response (first 300 chars): {full_text[:300]}"
             )
-        finally:
-            settings.set_llm_base_url(original_url)
+            assert has_think_close, (
+                f"Model {model_id}: Thinking mode response has <think> but MISSING </think>! "
+                f"Response (first 300 chars): {full_text[:300]}"
+            )
+            assert len(think_content) > 10, (
+                f"Model {model_id}: Thinking section is EMPTY or trivially short! "
+                f"Think content: '{think_content[:100]}'. "
+                f"This creates an empty thinking accordion in the UI."
+            )
+
+        print("\n".join(
+            f"  ✓ {r['model']}: thinking={r['think_content_len']} chars, total={r['total_len']} chars"
+            for r in think_results
+        ))
+
+        # At least 3 models should have succeeded
+        assert len(think_results) >= 3, (
+            f"Only {len(think_results)}/5 models produced results in thinking mode! "
+            f"Results: {think_results}"
+        )
 
     @pytest.mark.asyncio
     async def test_fast_mode_produces_concise_responses(self, api_key, random_models):
         """
         STRICT: Fast mode should produce concise responses (shorter than pro mode).
         """
-        original_url = settings.get_llm_base_url()
-        settings.set_llm_base_url("https://openrouter.ai/api/v1")
         fast_results = []
-        try:
-            for model_id in random_models:
-                try:
-                    req = ChatRequest(
-                        model=model_id,
-                        messages=[Message(role="user", content="What is the capital of France?")],
-                        mode="fast",
-                    )
-                    _, full_text = await _collect_generator_response(
-                        generate_chat_openrouter(req, offline_mode=False)
-                    )
-                except Exception as e:
-                    print(f"  ⚠ Model {model_id} errored in fast mode: {e}")
-                    continue
-
-                if len(full_text.strip()) == 0:
-                    print(f"  ⚠ Model {model_id} returned empty in fast mode")
-                    continue
+        responses = await _gather_mode_responses(random_models, _FAST_PROMPT_REQ)
+        for model_id, full_text in responses:
+            if isinstance(full_text, BaseException):
+                print(f"  ⚠ Model {model_id} errored in fast mode: {full_text}")
+                continue
 
-                fast_results.append({"model": model_id, "length": len(full_text)})
+            if len(full_text.strip()) == 0:
+                print(f"  ⚠ Model {model_id} returned empty in fast mode")
+                continue
 
-                # Fast mode should produce a real answer
-                assert len(full_text.strip()) > 0, (
-                    f"Model {model_id}: Fast mode returned EMPTY response!"
-                )
-                # Fast mode should be concise (max_tokens=512)
-                assert len(full_text) < 3000, (
-                    f"Model {model_id}: Fast mode response is too long ({len(full_text)} chars)! "
-                    f"Fast mode should be concise."
-                )
-                print(f"  ✓ {model_id}: fast={len(full_text)} chars")
+            fast_results.append({"model": model_id, "length": len(full_text)})
 
-            assert len(fast_results) >= 3, (
-                f"Only {len(fast_results)}/5 models produced results in fast mode!"
+            # Fast mode should produce a real answer
+            assert len(full_text.strip()) > 0, (
+                f"Model {model_id}: Fast mode returned EMPTY response!"
+            )
+            # Fast mode should be concise (max_tokens=512)
+            assert len(full_text) < 3000, (
+                f"Model {model_id}: Fast mode response is too long ({len(full_text)} chars)! "
+                f"Fast mode should be concise."
             )
-        finally:
-            settings.set_llm_base_url(original_url)
+
+        print("\n".join(f"  ✓ {r['model']}: fast={r['length']} chars" for r in fast_results))
+
+        assert len(fast_results) >= 3, (
+            f"Only {len(fast_results)}/5 models produced results in fast mode!"
+        )
 
     @pytest.mark.asyncio
     async def test_pro_mode_produces_detailed_responses(self, api_key, random_models):
         """
         STRICT: Pro mode should produce detailed, expert-level responses.
         """
-        original_url = settings.get_llm_base_url()
-        settings.set_llm_base_url("https://openrouter.ai/api/v1")
         pro_results = []
-        try:
-            for model_id in random_models:
-                try:
-                    req = ChatRequest(
-                        model=model_id,
-                        messages=[Message(role="user", content="Explain the difference between TCP and UDP protocols.")],
-                        mode="pro",
-                    )
-                    _, full_text = await _collect_generator_response(
-                        generate_chat_openrouter(req, offline_mode=False)
-                    )
-                except Exception as e:
-                    print(f"  ⚠ Model {model_id} errored in pro mode: {e}")
-                    continue
-
-                if len(full_text.strip()) == 0:
-                    print(f"  ⚠ Model {model_id} returned empty in pro mode")
-                    continue
+        responses = await _gather_mode_responses(random_models, _PRO_PROMPT_REQ)
+        for model_id, full_text in responses:
+            if isinstance(full_text, BaseException):
+                print(f"  ⚠ Model {model_id} errored in pro mode: {full_text}")
+                continue
 
-                pro_results.append({"model": model_id, "length": len(full_text)})
+            if len(full_text.strip()) == 0:
+                print(f"  ⚠ Model {model_id} returned empty in pro mode")
+                continue
 
-                # Pro mode should produce a substantial answer (at least 100 chars)
-                assert len(full_text.strip()) > 50, (
-                    f"Model {model_id}: Pro mode returned a too-short response! "
-                    f"({len(full_text)} chars). Pro mode should be detailed. "
-                    f"Response: {full_text[:200]}"
-                )
-                print(f"  ✓ {model_id}: pro={len(full_text)} chars")
+            pro_results.append({"model": model_id, "length": len(full_text)})
 
-            assert len(pro_results) >= 3, (
-                f"Only {len(pro_results)}/5 models produced results in pro mode!"
+            # Pro mode should produce a substantial answer (at least 100 chars)
+            assert len(full_text.strip()) > 50, (
+                f"Model {model_id}: Pro mode returned a too-short response! "
+                f"({len(full_text)} chars). Pro mode should be detailed. "
+                f"Response: {full_text[:200]}"
             )
-        finally:
-            settings.set_llm_base_url(original_url)
+
+        print("\n".join(f"  ✓ {r['model']}: pro={r['length']} chars" for r in pro_results))
+
+        assert len(pro_results) >= 3, (
+            f"Only {len(pro_results)}/5 models produced results in pro mode!"
+        )
 
     @pytest.mark.asyncio
     async def test_auto_mode_produces_responses(self, api_key, random_models):
         """
         STRICT: Auto mode should produce non-empty responses for all models.
         """
-        original_url = settings.get_llm_base_url()
-        settings.set_llm_base_url("https://openrouter.ai/api/v1")
         auto_results = []
-        try:
-            for model_id in random_models:
-                try:
-                    req = ChatRequest(
-                        model=model_id,
-                        messages=[Message(role="user", content="Hello, how are you today?")],
-                        mode="auto",
-                    )
-                    _, full_text = await _collect_generator_response(
-                        generate_chat_openrouter(req, offline_mode=False)
-                    )
-                except Exception as e:
-                    print(f"  ⚠ Model {model_id} errored in auto mode: {e}")
-                    continue
-
-                if len(full_text.strip()) == 0:
-                    print(f"  ⚠ Model {model_id} returned empty in auto mode")
-                    continue
+        responses = await _gather_mode_responses(random_models, _AUTO_PROMPT_REQ)
+        for model_id, full_text in responses:
+            if isinstance(full_text, BaseException):
+                print(f"  ⚠ Model {model_id} errored in auto mode: {full_text}")
+                continue
 
-                auto_results.append({"model": model_id, "length": len(full_text)})
-                assert len(full_text.strip()) > 0, (
-                    f"Model {model_id}: Auto mode returned EMPTY response!"
-                )
-                print(f"  ✓ {model_id}: auto={len(full_text)} chars")
+            if len(full_text.strip()) == 0:
+                print(f"  ⚠ Model {model_id} returned empty in auto mode")
+                continue
 
-            assert len(auto_results) >= 3, (
-                f"Only {len(auto_results)}/5 models produced results in auto mode!"
+            auto_results.append({"model": model_id, "length": len(full_text)})
+            assert len(full_text.strip()) > 0, (
+                f"Model {model_id}: Auto mode returned EMPTY response!"
             )
-        finally:
-            settings.set_llm_base_url(original_url)
+
+        print("\n".join(f"  ✓ {r['model']}: auto={r['length']} chars" for r in auto_results))
+
+        assert len(auto_results) >= 3, (
+            f"Only {len(auto_results)}/5 models produced results in auto mode!"
+        )
 
     @pytest.mark.asyncio
-    async def test_all_modes_via_emulator(self, emulator_model):
+    async def test_all_modes_via_emulator(self, resolved_emulator_model, monkeypatch):
         """
         STRICT: All 4 modes must work through the emulator too (not just OpenRouter).
         """
-        original_url = settings.get_llm_base_url()
-        settings.set_llm_base_url(EMULATOR_URL.rsplit("/api/v1", 1)[0] + "/api/v1")
-        from services.openrouter import invalidate_emulator_model_cache
-        invalidate_emulator_model_cache()
-        try:
+        _prime_emulator_model_cache(monkeypatch, resolved_emulator_model)
+        lengths = []
+        with _override_llm_base_url(_EMULATOR_BASE_URL):
             for mode_name in ["auto", "fast", "thinking", "pro"]:
                 req = ChatRequest(
                     model="any-model",
                     messages=[Message(role="user", content="What is 3+4? Show your work.")],
                     mode=mode_name,
                 )
-                _, full_text = await _collect_generator_response(
+                _, full_text, _ = await _collect_generator_response(
                     generate_chat_openrouter(req, offline_mode=True)
                 )
                 assert len(full_text.strip()) > 0, (
@@ -1320,64 +1361,52 @@ class TestPerModeAllRandomModels:
                         f"The backend enforcement should have wrapped the response. "
                         f"Response: {full_text[:300]}"
                     )
-                print(f"  ✓ Emulator mode '{mode_name}': {len(full_text)} chars")
-        finally:
-            settings.set_llm_base_url(original_url)
-            invalidate_emulator_model_cache()
+                lengths.append((mode_name, len(full_text)))
+        print("\n".join(f"  ✓ Emulator mode '{m}': {n} chars" for m, n in lengths))
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # SECTION 16: Strict Title Spacing Test
 # ══════════════════════════════════════════════════════════════════════════════
 
+@pytest.mark.usefixtures("openrouter_base_url")
 class TestStrictTitleSpacing:
     """Verifies that generated titles have proper word spacing — not concatenated tokens."""
 
     @pytest.mark.asyncio
-    async def test_title_has_spaces_between_words(self, api_key):
+    async def test_title_has_spaces_between_words(self, api_key, captured_titles):
         """
         STRICT: Titles must have spaces between words.
         This catches the bug where max_tokens was too low and models
         produced token-concatenated titles like 'WeatherForecastTokyo'.
         """
-        original_url = settings.get_llm_base_url()
-        settings.set_llm_base_url("https://openrouter.ai/api/v1")
-        try:
-            from unittest.mock import patch, MagicMock
-
-            test_prompts = [
-                "What is the weather forecast for Tokyo this week?",
-                "How do I bake a chocolate cake from scratch?",
-                "Explain quantum computing in simple terms",
-            ]
-
-            for prompt in test_prompts:
-                captured_title = {}
-
-                def mock_update(db, conv_id, title, _cap=captured_title):
-                    _cap["value"] = title
-
-                with patch("services.history.update_conversation_title", side_effect=mock_update):
-                    with patch("database.SessionLocal") as mock_session:
-                        mock_db = MagicMock()
-                        mock_session.return_value = mock_db
-                        await generate_title_background(prompt, "test-conv", "openai/gpt-4o-mini")
-
-                assert "value" in captured_title, f"Title not generated for prompt: '{prompt[:40]}'"
-                title = captured_title["value"]
-
-                # STRICT: Must have spaces
-                assert " " in title, (
-                    f"Title has NO SPACES! This is the spacing bug. "
-                    f"Title: '{title}', Prompt: '{prompt[:40]}'"
-                )
+        test_prompts = [
+            "What is the weather forecast for Tokyo this week?",
+            "How do I bake a chocolate cake from scratch?",
+            "Explain quantum computing in simple terms",
+        ]
+
+        # Each prompt gets its own conversation id, so the concurrent
+        # generations record their titles under separate keys
+        await asyncio.gather(*(
+            generate_title_background(prompt, f"test-conv-{i}", "openai/gpt-4o-mini")
+            for i, prompt in enumerate(test_prompts)
+        ))
+
+        for i, prompt in enumerate(test_prompts):
+            title = captured_titles.get(f"test-conv-{i}")
+            assert title is not None, f"Title not generated for prompt: '{prompt[:40]}'"
+
+            # STRICT: Must have spaces
+            assert " " in title, (
+                f"Title has NO SPACES! This is the spacing bug. "
+                f"Title: '{title}', Prompt: '{prompt[:40]}'"
+            )
 
-                words = title.strip().split()
-                assert len(words) >= 2, (
-                    f"Title is a single word (token concatenation bug). "
-                    f"Title: '{title}'"
-                )
+            words = title.strip().split()
+            assert len(words) >= 2, (
+                f"Title is a single word (token concatenation bug). "
+                f"Title: '{title}'"
+            )
 
-                print(f"  ✓ Title for '{prompt[:30]}...': '{title}'")
-        finally:
-            settings.set_llm_base_url(original_url)
+            print(f"  ✓ Title for '{prompt[:30]}...': '{title}'")